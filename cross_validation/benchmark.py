@@ -0,0 +1,67 @@
+import argparse
+import time
+import tracemalloc
+from typing import Dict, Sequence
+
+import numpy as np
+from cv import BoostedKFold
+from sklearn.model_selection import StratifiedKFold
+
+
+def loop_test_fold(cv: BoostedKFold, y: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """The former per-sample fold assignment of ``BoostedKFold.split``, kept as the baseline to compare against."""
+    random_indices = np.where(groups != -1)[0]
+    skf = StratifiedKFold(n_splits=cv.n_splits, shuffle=cv.shuffle, random_state=cv.random_state)
+
+    test_fold = [-1] * len(y)
+    for split_nr, (_, testing_indices) in enumerate(skf.split(y[random_indices], y[random_indices])):
+        for test_idx in testing_indices:
+            test_fold[random_indices[test_idx]] = split_nr
+
+    return np.array(test_fold)
+
+
+def synthetic_samples(n_samples: int, boosted_fraction: float = 0.1, seed: int = 0):
+    """Generate imbalanced binary labels, with a fraction of boosted samples of the minority class."""
+    rng = np.random.default_rng(seed)
+    y = (rng.random(n_samples) < 0.05).astype(np.int64)
+    groups = np.zeros(n_samples, dtype=np.int64)
+    groups[(y == 1) & (rng.random(n_samples) < boosted_fraction / 0.05)] = -1
+
+    return y, groups
+
+
+def measure(function, *args) -> Dict[str, float]:
+    """Run `function` once and return its wall time and the peak memory it allocated."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    function(*args)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'seconds': seconds, 'peak_mb': peak / 2**20}
+
+
+def benchmark(sizes: Sequence[int], n_splits: int = 5, loop_limit: int = 10**6):
+    """Time the vectorized fold assignment, and the per-sample loop up to `loop_limit` samples."""
+    cv = BoostedKFold(n_splits=n_splits, shuffle=True, random_state=0)
+    for n_samples in sizes:
+        y, groups = synthetic_samples(n_samples)
+        vectorized = measure(cv.test_fold, y, groups)
+        line = f'{n_samples:>11,d} samples: vectorized {vectorized["seconds"]:.3f}s, {vectorized["peak_mb"]:.1f} MB peak'
+
+        if n_samples <= loop_limit:
+            assert np.array_equal(cv.test_fold(y, groups), loop_test_fold(cv, y, groups))
+            loop = measure(loop_test_fold, cv, y, groups)
+            line += f' | loop {loop["seconds"]:.3f}s, {loop["peak_mb"]:.1f} MB peak'
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the fold assignment of BoostedKFold')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10**5, 10**6, 10**7], help='numbers of samples')
+    parser.add_argument('--splits', type=int, default=5, help='number of folds')
+    args = parser.parse_args()
+
+    benchmark(args.sizes, args.splits)
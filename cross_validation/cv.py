@@ -1,9 +1,39 @@
-from typing import Sequence
+import os
+import shutil
+import tempfile
+import time
+import warnings
+from typing import Callable, Dict, Optional, Sequence, Tuple
 
+import joblib
 import matplotlib.pyplot as plt
 import numpy as np
+from joblib import Parallel, delayed
+from matplotlib.colors import ListedColormap
 from matplotlib.patches import Patch
-from sklearn.model_selection import PredefinedSplit, StratifiedKFold
+from sklearn.base import clone
+from sklearn.model_selection import ParameterGrid
+from sklearn.utils import check_random_state
+
+
+def _classes_by_appearance(y: np.ndarray, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the classes of `y[mask]` in order of first appearance, as ``StratifiedKFold`` orders them,
+    and their counts.
+
+    Small non-negative integer labels are counted with ``np.bincount`` instead of sorting a copy of all samples.
+    """
+    if y.dtype.kind in 'iu' and len(y) and y.min() >= 0 and y.max() < 2**16:
+        counts = np.bincount(y) - np.bincount(y[~mask], minlength=y.max() + 1)
+        labels = np.flatnonzero(counts)
+        if len(labels) <= 256:
+            first = np.array([np.argmax((y == label) & mask) for label in labels])
+            order = np.argsort(first)
+            return labels[order], counts[labels[order]]
+
+    labels, first, counts = np.unique(y[mask], return_index=True, return_counts=True)
+    order = np.argsort(first)
+
+    return labels[order], counts[order]
 
 
 class BoostedKFold:
@@ -27,6 +57,62 @@ class BoostedKFold:
         self.shuffle = shuffle
         self.random_state = random_state
 
+    def test_fold(self, y: np.array, groups: np.array = None) -> np.ndarray:
+        """Assign every random sample to a test fold, and every boosted sample to no test fold.
+
+        The allocation and the shuffling equal those of ``StratifiedKFold`` with the same
+        ``random_state`` on the random samples, but the folds are scattered into one small-int array
+        with numpy instead of per sample.
+
+        Args:
+            y (ndarray): array-like of shape (n_samples,),
+                The target variable for supervised learning problems.
+            groups (ndarray, default=None): array-like of shape (n_samples,): '-1' for boosted samples.
+                All samples are random samples if None.
+
+        Returns:
+            ndarray: int8 array of shape (n_samples,) with the test fold of every sample, -1 for boosted samples.
+                int16 if `n_splits` exceeds 127.
+        """
+        y = np.asarray(y).ravel()
+        rng = check_random_state(self.random_state)
+
+        if groups is None:
+            is_random = np.ones(len(y), dtype=bool)
+        else:
+            is_random = np.asarray(groups).ravel() != -1
+
+        labels, counts = _classes_by_appearance(y, is_random)
+        if np.all(self.n_splits > counts):
+            raise ValueError(f'n_splits={self.n_splits} cannot be greater than the number of members in each class.')
+        if self.n_splits > counts.min():
+            warnings.warn(
+                f'The least populated class in y has only {counts.min()} members, '
+                f'which is less than n_splits={self.n_splits}.',
+                UserWarning,
+            )
+
+        # round robin over the samples sorted by class: the number of positions `p` in [start, end) of a class
+        # with `p % n_splits == fold` is the number of samples of that class in the test set of `fold`
+        ends = np.cumsum(counts)
+        folds = np.arange(self.n_splits)[:, np.newaxis]
+        allocation = (ends + self.n_splits - 1 - folds) // self.n_splits - (
+            ends - counts + self.n_splits - 1 - folds
+        ) // self.n_splits
+
+        dtype = np.int8 if self.n_splits <= np.iinfo(np.int8).max else np.int16
+        test_fold = np.full(len(y), -1, dtype=dtype)
+        for k, label in enumerate(labels):
+            folds_for_class = np.arange(self.n_splits, dtype=dtype).repeat(allocation[:, k])
+            if self.shuffle:
+                rng.shuffle(folds_for_class)
+            # scattered straight to the positions of the random samples, wherever the boosted samples are
+            is_class = y == label
+            is_class &= is_random
+            test_fold[is_class] = folds_for_class
+
+        return test_fold
+
     def split(self, X: np.array, y: np.array, groups: np.array):
         """Generate indices to split data into training and test set, excluding data in groups with value '-1'.
 
@@ -36,6 +122,7 @@ class BoostedKFold:
         Args:
             X (ndarray): array-like of shape (n_samples, n_features)
                 Training data, where `n_samples` is the number of samples and `n_features` is the number of features.
+                Only present for compatibility with the scikit-learn splitters.
             y (ndarray): array-like of shape (n_samples,),
                 The target variable for supervised learning problems.
             groups (ndarray): array-like of shape 1d: '-1' for elements to be excluded
@@ -44,36 +131,76 @@ class BoostedKFold:
             train (ndarray): The training set indices for that split.
             test (ndarray): The testing set indices for that split.
         """
-        # separate boosted sample data that have group `-1`, from random sample data
-        boosted_indices = np.where(groups == -1)[0]
-        random_indices = np.where(groups != -1)[0]
+        # boosted samples are in every training set and in no test set
+        yield from split_plan(self.test_fold(y, groups), self.n_splits)
 
-        skf = StratifiedKFold(n_splits=self.n_splits, shuffle=self.shuffle)
-        # split the randomly sampled indices that are to be included in the test-set in ``n_splits`` splits
-        stratified_random_splits = skf.split(X[random_indices], y[random_indices])
+    def plot(
+        self,
+        X: np.array,
+        y: np.array,
+        groups: np.array,
+        splits: Sequence,
+        ax,
+        marker='_',
+        lw=10,
+        mode='auto',
+        max_bins=2000,
+    ):
+        """Visualizes the CV split behavior.
 
-        random_sampled = [0] * len(random_indices)
-        boosted_sampled = [-1] * len(boosted_indices)
+        Args:
+            mode (str, default='auto'): 'scatter' draws a marker per sample and split,
+                'raster' draws all splits, classes and groups as one image, which scales to millions of samples.
+                'auto' rasters above 1000 samples.
+            max_bins (int, default=2000): maximum number of sample columns in raster mode. Above it, consecutive
+                samples are binned into a column, colored by its test samples and its rarest class and group,
+                so short runs of test or boosted samples stay visible.
+        """
+        cmap_samples = plt.cm.Spectral
+        cmap_groups = plt.cm.Accent
+        cmap_cv = plt.cm.coolwarm
 
-        # converts the random stratified split test-set indices to the ``n_splits`` enumeration
-        for split_nr, (_, testing_indices) in enumerate(stratified_random_splits):
-            # defines which random sample datapoint is in which test-fold
-            for test_idx in testing_indices:
-                random_sampled[test_idx] = split_nr
+        n_samples = len(y)
+        if mode == 'auto':
+            mode = 'raster' if n_samples > 1000 else 'scatter'
 
-        # concatenate the randomly sampled split numbers and the boosted sampling split numbers
-        predefined_splits = random_sampled + boosted_sampled
-        # boosted samples are not accounted for in the test-fold splits
-        ps = PredefinedSplit(test_fold=predefined_splits)
+        if mode == 'raster':
+            self._plot_raster(y, groups, splits, ax, cmap_cv, cmap_groups, cmap_samples, max_bins)
+        else:
+            self._plot_scatter(X, y, groups, splits, ax, cmap_cv, cmap_groups, cmap_samples, marker, lw)
 
-        return ps.split(X)
+        # format the visualization
+        yticklabels = list(range(self.n_splits)) + ['class', 'group']
+        ax.set(
+            yticks=np.arange(self.n_splits + 2) + 0.5,
+            yticklabels=yticklabels,
+            xlabel='Sample index',
+            ylabel='CV iteration',
+            ylim=[self.n_splits + 2.2, -0.2],
+            xlim=[0, n_samples],
+        )
+        if mode != 'raster':
+            x_axis = [x + 0.5 for x in range(n_samples)]
+            ax.set(xticks=x_axis, xticklabels=range(n_samples))
+        ax.set_title(f'{type(self).__name__}', fontsize=15)
 
-    def plot(self, X: np.array, y: np.array, groups: np.array, splits: Sequence, ax, marker='_', lw=10):
-        """Visualizes the CV split behavior."""
-        cmap_samples = plt.cm.Spectral
-        cmap_groups = plt.cm.Accent
-        cmap_cv = plt.cm.coolwarm
+        ax.legend(
+            [
+                Patch(color=cmap_cv(0.8)),
+                Patch(color=cmap_cv(0.1)),
+                Patch(color=cmap_groups(0.01)),
+                Patch(color=cmap_groups(0.99)),
+                Patch(color=cmap_samples(0.99)),
+                Patch(color=cmap_samples(0.01)),
+            ],
+            ['Test', 'Train', '0', '1', 'Random', 'Boosted'],
+            loc=(1.02, 0.65),
+        )
 
+        return ax
+
+    def _plot_scatter(self, X, y, groups, splits, ax, cmap_cv, cmap_groups, cmap_samples, marker, lw):
+        """Draw a marker per sample for every split, the classes and the groups."""
         # iterate over the CV splits to visualise train/test data points per split
         for ii, (tr, tt) in enumerate(splits):
             # Fill in indices with the training/test groups
@@ -105,31 +232,450 @@ class BoostedKFold:
             x_axis, [self.n_splits + 1.5] * len(X), c=groups, marker=marker, lw=lw, cmap=cmap_samples
         )
 
-        # format the visualization
-        yticklabels = list(range(self.n_splits)) + ['class', 'group']
-        ax.set(
-            yticks=np.arange(self.n_splits + 2) + 0.5,
-            yticklabels=yticklabels,
-            xlabel='Sample index',
-            ylabel='CV iteration',
-            ylim=[self.n_splits + 2.2, -0.2],
-            xlim=[0, len(X)],
-            xticks=x_axis,
-            xticklabels=range(len(X)),
-        )
-        ax.set_title(f'{type(self).__name__}', fontsize=15)
+    def _plot_raster(self, y, groups, splits, ax, cmap_cv, cmap_groups, cmap_samples, max_bins):
+        """Draw the splits, classes and groups as one integer image with a color per code."""
+        y = np.asarray(y).ravel()
+        groups = np.asarray(groups).ravel()
+        # bins of `step` consecutive samples are a column of the image
+        step = max(1, int(np.ceil(len(y) / max_bins)))
+        bin_starts = np.arange(0, len(y), step)
 
-        ax.legend(
+        def reduce_bins(codes, priority):
+            """Return per bin the code of the highest priority among its samples."""
+            return np.argsort(priority)[np.maximum.reduceat(priority[codes], bin_starts)]
+
+        def rarest_first(codes, n_codes):
+            """Prioritize the codes by ascending frequency."""
+            priority = np.empty(n_codes, dtype=np.int64)
+            priority[np.argsort(-np.bincount(codes, minlength=n_codes), kind='stable')] = np.arange(n_codes)
+            return priority
+
+        classes, class_codes = np.unique(y, return_inverse=True)
+        group_values, group_codes = np.unique(groups, return_inverse=True)
+        class_codes, group_codes = class_codes.ravel(), group_codes.ravel()
+
+        # codes: 0 train, 1 test, 2 unused in the split, then the classes, then the groups
+        image = np.full((self.n_splits + 2, len(bin_starts)), 2, dtype=np.int32)
+        split_priority = np.array([1, 2, 0])  # a bin with any test sample is test, else train if it has any
+        for ii, (tr, tt) in enumerate(splits):
+            row = np.full(len(y), 2, dtype=np.int8)
+            row[tt] = 1
+            row[tr] = 0
+            image[ii] = reduce_bins(row, split_priority)
+        image[self.n_splits] = 3 + reduce_bins(class_codes, rarest_first(class_codes, len(classes)))
+        group_priority = rarest_first(group_codes, len(group_values))
+        image[self.n_splits + 1] = 3 + len(classes) + reduce_bins(group_codes, group_priority)
+
+        # the same colors as the scatter mode, which normalizes the values of each row to [0, 1]
+        def normalize(values):
+            values = values.astype(float)
+            span = values.max() - values.min()
+            return (values - values.min()) / span if span else np.zeros(len(values))
+
+        class_values = classes if classes.dtype.kind in 'iufb' else np.arange(len(classes))
+        palette = np.vstack(
             [
-                Patch(color=cmap_cv(0.8)),
-                Patch(color=cmap_cv(0.1)),
-                Patch(color=cmap_groups(0.01)),
-                Patch(color=cmap_groups(0.99)),
-                Patch(color=cmap_samples(0.99)),
-                Patch(color=cmap_samples(0.01)),
-            ],
-            ['Test', 'Train', '0', '1', 'Random', 'Boosted'],
-            loc=(1.02, 0.65),
+                cmap_cv((np.array([0, 1]) + 0.2) / 1.4),  # vmin=-0.2 and vmax=1.2, as in the scatter mode
+                [[1.0, 1.0, 1.0, 0.0]],
+                cmap_groups(normalize(class_values)),
+                cmap_samples(normalize(group_values)),
+            ]
         )
 
-        return ax
+        ax.imshow(
+            image,
+            cmap=ListedColormap(palette),
+            vmin=-0.5,
+            vmax=len(palette) - 0.5,
+            aspect='auto',
+            interpolation='nearest',
+            extent=[0, len(bin_starts) * step, self.n_splits + 2, 0],
+        )
+
+
+class RepeatedBoostedKFold:
+    def __init__(self, n_splits=5, n_repeats=10, random_state=None, plan_file=None):
+        """
+        Args:
+            n_splits (int, default=5):
+                Number of folds. Must be at least 2.
+            n_repeats (int, default=10):
+                Number of times BoostedKFold is repeated, with differently shuffled folds each time.
+            random_state (int or RandomState instance, default=None):
+                Controls the shuffling of every repetition.
+                Pass an int for reproducible output across multiple function calls.
+            plan_file (str, default=None):
+                .npy file to save the fold plan to, or to load it from if it exists,
+                so reruns and worker processes reuse identical splits without recomputing them.
+        """
+        self.n_splits = n_splits
+        self.n_repeats = n_repeats
+        self.random_state = random_state
+        self.plan_file = plan_file
+
+    def get_n_splits(self, X=None, y=None, groups=None) -> int:
+        """Returns the number of splitting iterations, `n_splits` * `n_repeats`."""
+        return self.n_splits * self.n_repeats
+
+    def fold_plan(self, y: np.array, groups: np.array) -> np.ndarray:
+        """Assign the test fold of every sample in every repetition.
+
+        Args:
+            y (ndarray): array-like of shape (n_samples,),
+                The target variable for supervised learning problems.
+            groups (ndarray): array-like of shape 1d: '-1' for boosted samples.
+
+        Returns:
+            ndarray: int8 matrix of shape (n_repeats, n_samples) with the test fold of every sample per repetition,
+                -1 for boosted samples. Memory-mapped read-only if it was loaded from `plan_file`.
+        """
+        if self.plan_file and os.path.exists(self.plan_file):
+            plan = load_plan(self.plan_file)
+            _check_plan(plan, self.plan_file, self.n_repeats, self.n_splits, groups)
+            return plan
+
+        rng = check_random_state(self.random_state)
+        cv = BoostedKFold(n_splits=self.n_splits, shuffle=True, random_state=rng)
+        plan = np.stack([cv.test_fold(y, groups) for _ in range(self.n_repeats)])
+
+        if self.plan_file:
+            save_plan(self.plan_file, plan)
+
+        return plan
+
+    def split(self, X: np.array, y: np.array, groups: np.array):
+        """Generate indices to split data into training and test set for every repetition,
+        excluding data in groups with value '-1' from the test sets.
+
+        Args:
+            X (ndarray): array-like of shape (n_samples, n_features)
+                Only present for compatibility with the scikit-learn splitters.
+            y (ndarray): array-like of shape (n_samples,),
+                The target variable for supervised learning problems.
+            groups (ndarray): array-like of shape 1d: '-1' for elements to be excluded
+
+        Yields:
+            train (ndarray): The training set indices for that split.
+            test (ndarray): The testing set indices for that split.
+        """
+        yield from split_plan(self.fold_plan(y, groups), self.n_splits)
+
+
+def split_plan(plan: np.ndarray, n_splits: int):
+    """Generate the train and test indices of a fold plan, one split at a time.
+
+    Only the indices of the current split are held in memory, the plan itself stays one small-int matrix.
+
+    Args:
+        plan (ndarray): fold plan of shape (n_repeats, n_samples) or test folds of shape (n_samples,).
+        n_splits (int): number of folds per repetition.
+
+    Yields:
+        train (ndarray): The training set indices for that split.
+        test (ndarray): The testing set indices for that split.
+    """
+    for test_fold in np.atleast_2d(plan):
+        for fold in range(n_splits):
+            is_test = test_fold == fold
+            yield np.flatnonzero(~is_test), np.flatnonzero(is_test)
+
+
+def _check_plan(plan: np.ndarray, plan_file: str, n_rows: int, n_splits: int, groups: np.array):
+    """Raise a ValueError if a cached fold plan was not made for these samples and this number of folds.
+
+    Every row must have the test folds ``range(n_splits)`` and mark exactly the boosted samples with -1,
+    other negative values such as the outer test markers of a nested plan are ignored.
+    """
+    groups = np.asarray(groups).ravel()
+    problem = None
+    if plan.shape != (n_rows, len(groups)):
+        problem = f'has shape {plan.shape}, expected ({n_rows}, {len(groups)})'
+    else:
+        is_boosted = groups == -1
+        # one row at a time, so a memory-mapped plan is never read into memory at once
+        for row in plan:
+            folds = np.flatnonzero(np.bincount(row[row >= 0], minlength=n_splits))
+            if not np.array_equal(folds, np.arange(n_splits)):
+                problem = f'has the test folds {folds.tolist()}, expected {n_splits} folds'
+                break
+            if not np.array_equal(row == -1, is_boosted):
+                problem = 'marks other samples as boosted than `groups`'
+                break
+
+    if problem:
+        raise ValueError(f'The fold plan in {plan_file} {problem}. Remove it to create a new plan.')
+
+
+def save_plan(plan_file: str, plan: np.ndarray):
+    """Save a fold plan as .npy, atomically, so concurrent readers never see a partial file.
+
+    Args:
+        plan_file (str): .npy file path.
+        plan (ndarray): fold plan from ``RepeatedBoostedKFold.fold_plan`` or ``BoostedKFold.test_fold``.
+    """
+    temp_file = f'{plan_file}.tmp'
+    with open(temp_file, 'wb') as f:
+        np.save(f, plan)
+    os.replace(temp_file, plan_file)
+
+
+def load_plan(plan_file: str, mmap_mode: str = 'r') -> np.ndarray:
+    """Load a fold plan saved with ``save_plan``, memory-mapped so worker processes share one copy.
+
+    Args:
+        plan_file (str): .npy file path.
+        mmap_mode (str or None, default='r'): memory-map mode, None reads the plan into memory.
+
+    Returns:
+        ndarray: the fold plan.
+    """
+    return np.load(plan_file, mmap_mode=mmap_mode)
+
+
+def _memmap(X, temp_folder: str):
+    """Dump X to `temp_folder` and load it memory-mapped, so worker processes share it instead of a pickled copy."""
+    if isinstance(X, np.memmap):
+        return X
+
+    X_file = os.path.join(temp_folder, 'X.joblib')
+    joblib.dump(X, X_file)
+
+    return joblib.load(X_file, mmap_mode='r')
+
+
+def _fit_and_predict(estimator, X, y: np.ndarray, test_fold: np.ndarray, fold: int, classes: np.ndarray):
+    """Fit a clone of `estimator` on the training samples of `fold` and predict its test samples."""
+    is_test = test_fold == fold
+    train, test = np.flatnonzero(~is_test), np.flatnonzero(is_test)
+
+    start = time.perf_counter()
+    estimator.fit(X[train], y[train])
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictions = estimator.predict(X[test])
+    probabilities = None
+    if hasattr(estimator, 'predict_proba'):
+        # a fold may lack a rare class, so align the columns with the classes of all samples
+        probabilities = np.zeros((len(test), len(classes)))
+        probabilities[:, np.searchsorted(classes, estimator.classes_)] = estimator.predict_proba(X[test])
+    predict_time = time.perf_counter() - start
+
+    return predictions, probabilities, fit_time, predict_time
+
+
+def boosted_cross_val_predict(estimator, X, y: np.array, groups: np.array, cv: BoostedKFold, n_jobs: int = -1) -> Dict:
+    """Generate out-of-fold predictions for the random samples, fitting the folds in parallel processes.
+
+    ``cross_val_predict`` cannot return predictions for a test-set that differs in size from `y`,
+    which is the case for the BoostedKFold split: boosted samples are never tested.
+    X is dumped once to a temporary file and memory-mapped by every worker, instead of being pickled per fold.
+
+    Args:
+        estimator (estimator object): unfitted scikit-learn estimator, cloned for every fold.
+        X (ndarray or sparse matrix): array-like of shape (n_samples, n_features)
+            Training data, where `n_samples` is the number of samples and `n_features` is the number of features.
+        y (ndarray): array-like of shape (n_samples,),
+            The target variable for supervised learning problems.
+        groups (ndarray): array-like of shape 1d: '-1' for boosted samples.
+        cv (BoostedKFold): the splitter that assigns the test folds.
+        n_jobs (int, default=-1): number of worker processes, -1 uses all cores.
+
+    Returns:
+        dict: with keys
+            `test_fold` (ndarray): test fold per sample, -1 for boosted samples.
+            `indices` (ndarray): indices of the tested samples, in ascending order.
+            `predictions` (ndarray): predicted class per tested sample.
+            `probabilities` (ndarray or None): class probabilities per tested sample,
+                None if the estimator has no ``predict_proba``.
+            `classes` (ndarray): the classes in the column order of `probabilities`.
+            `fit_time` (ndarray): seconds to fit per fold.
+            `predict_time` (ndarray): seconds to predict per fold.
+    """
+    y = np.asarray(y).ravel()
+    test_fold = cv.test_fold(y, groups)
+    classes = np.unique(y)
+
+    temp_folder = tempfile.mkdtemp(prefix='boosted_cv_')
+    try:
+        X = _memmap(X, temp_folder)
+        results = Parallel(n_jobs=n_jobs, temp_folder=temp_folder)(
+            delayed(_fit_and_predict)(clone(estimator), X, y, test_fold, fold, classes)
+            for fold in range(cv.n_splits)
+        )
+    finally:
+        # release the memory map before its file is removed
+        del X
+        shutil.rmtree(temp_folder, ignore_errors=True)
+
+    indices = np.flatnonzero(test_fold != -1)
+    # every tested sample belongs to exactly one fold, so its position among the tested samples follows from the
+    # order of its index within the fold; scatter each fold's predictions there with one vectorized assignment
+    position = np.empty(len(test_fold), dtype=np.int64)
+    position[indices] = np.arange(len(indices))
+
+    predictions = np.empty(len(indices), dtype=np.asarray(results[0][0]).dtype)
+    has_probabilities = results[0][1] is not None
+    probabilities = np.empty((len(indices), len(classes))) if has_probabilities else None
+    for fold, (fold_predictions, fold_probabilities, _, _) in enumerate(results):
+        rows = position[test_fold == fold]
+        predictions[rows] = fold_predictions
+        if has_probabilities:
+            probabilities[rows] = fold_probabilities
+
+    return {
+        'test_fold': test_fold,
+        'indices': indices,
+        'predictions': predictions,
+        'probabilities': probabilities,
+        'classes': classes,
+        'fit_time': np.array([result[2] for result in results]),
+        'predict_time': np.array([result[3] for result in results]),
+    }
+
+
+def nested_fold_plan(y: np.array, groups: np.array, outer_cv: BoostedKFold, inner_cv: BoostedKFold) -> np.ndarray:
+    """Assign the inner test fold of every sample within the training set of every outer fold.
+
+    Boosted samples are in no outer and no inner test set, but in every training set.
+
+    Args:
+        y (ndarray): array-like of shape (n_samples,),
+            The target variable for supervised learning problems.
+        groups (ndarray): array-like of shape 1d: '-1' for boosted samples.
+        outer_cv (BoostedKFold): the splitter of the evaluation folds.
+        inner_cv (BoostedKFold): the splitter of the search folds within each outer training set.
+
+    Returns:
+        ndarray: int8 matrix of shape (outer n_splits, n_samples) with per outer fold the inner test fold of every
+            sample, -1 for boosted samples and -2 for the samples in the outer test set.
+    """
+    y = np.asarray(y).ravel()
+    groups = np.asarray(groups).ravel()
+    outer_test_fold = outer_cv.test_fold(y, groups)
+
+    plan = np.full((outer_cv.n_splits, len(y)), -2, dtype=outer_test_fold.dtype)
+    for fold in range(outer_cv.n_splits):
+        is_train = outer_test_fold != fold
+        plan[fold, is_train] = inner_cv.test_fold(y[is_train], groups[is_train])
+
+    return plan
+
+
+def _fit_and_score(estimator, X, y: np.ndarray, plan: np.ndarray, outer_fold: int, inner_fold: Optional[int], scoring):
+    """Fit on the training samples of an inner fold, or of the outer fold if `inner_fold` is None, and score."""
+    folds = plan[outer_fold]
+    if inner_fold is None:
+        is_test = folds == -2
+        is_train = ~is_test
+    else:
+        is_test = folds == inner_fold
+        is_train = (folds != -2) & ~is_test
+    train, test = np.flatnonzero(is_train), np.flatnonzero(is_test)
+
+    start = time.perf_counter()
+    estimator.fit(X[train], y[train])
+    fit_time = time.perf_counter() - start
+
+    score = scoring(estimator, X[test], y[test]) if scoring else estimator.score(X[test], y[test])
+
+    return score, fit_time
+
+
+def nested_cross_validate(
+    estimator,
+    param_grid: Dict,
+    X,
+    y: np.array,
+    groups: np.array,
+    outer_cv: BoostedKFold,
+    inner_cv: Optional[BoostedKFold] = None,
+    scoring: Optional[Callable] = None,
+    n_jobs: int = -1,
+    plan_file: Optional[str] = None,
+) -> Dict:
+    """Estimate the performance of a hyperparameter search with nested cross-validation on boosted sample data.
+
+    Every candidate is fitted on every inner fold of every outer fold in one process pool, the best candidate per
+    outer fold is refitted on its whole training set and scored on its outer test set.
+    All splits come from one nested fold plan, computed once and optionally cached in `plan_file`,
+    and X is memory-mapped by the workers.
+
+    Args:
+        estimator (estimator object): unfitted scikit-learn estimator, cloned for every fit.
+        param_grid (dict or list of dicts): candidate hyperparameters, as for ``GridSearchCV``.
+        X (ndarray or sparse matrix): array-like of shape (n_samples, n_features)
+            Training data, where `n_samples` is the number of samples and `n_features` is the number of features.
+        y (ndarray): array-like of shape (n_samples,),
+            The target variable for supervised learning problems.
+        groups (ndarray): array-like of shape 1d: '-1' for boosted samples.
+        outer_cv (BoostedKFold): the splitter of the evaluation folds.
+        inner_cv (BoostedKFold, default=None): the splitter of the search folds,
+            3 shuffled folds with the `random_state` of `outer_cv` if None.
+        scoring (callable, default=None): scorer(estimator, X, y), the estimator's ``score`` method if None.
+        n_jobs (int, default=-1): number of worker processes, -1 uses all cores.
+        plan_file (str, default=None): .npy file to save the nested fold plan to, or to load it from if it exists.
+
+    Returns:
+        dict: with keys
+            `outer_scores` (ndarray): score of the best candidate on every outer test set.
+            `best_params` (list): best candidate per outer fold.
+            `candidates` (list): all candidates, in the order of `inner_scores`.
+            `inner_scores` (ndarray): scores of shape (outer n_splits, n_candidates, inner n_splits).
+            `plan` (ndarray): the nested fold plan, see ``nested_fold_plan``.
+    """
+    y = np.asarray(y).ravel()
+    if inner_cv is None:
+        inner_cv = BoostedKFold(n_splits=3, shuffle=True, random_state=outer_cv.random_state)
+    candidates = list(ParameterGrid(param_grid))
+
+    if plan_file and os.path.exists(plan_file):
+        plan = load_plan(plan_file)
+        _check_plan(plan, plan_file, outer_cv.n_splits, inner_cv.n_splits, groups)
+        # every random sample is in the outer test set of exactly one outer fold
+        outer_tests = np.zeros(len(y), dtype=np.int64)
+        for row in plan:
+            outer_tests += row == -2
+        if not np.array_equal(outer_tests, (np.asarray(groups).ravel() != -1).astype(np.int64)):
+            raise ValueError(
+                f'The fold plan in {plan_file} does not assign every random sample to one of '
+                f'{outer_cv.n_splits} outer test sets. Remove it to create a new plan.'
+            )
+    else:
+        plan = nested_fold_plan(y, groups, outer_cv, inner_cv)
+        if plan_file:
+            save_plan(plan_file, plan)
+
+    temp_folder = tempfile.mkdtemp(prefix='boosted_cv_')
+    try:
+        X = _memmap(X, temp_folder)
+        with Parallel(n_jobs=n_jobs, temp_folder=temp_folder) as parallel:
+            inner = parallel(
+                delayed(_fit_and_score)(clone(estimator).set_params(**params), X, y, plan, outer, inner, scoring)
+                for outer in range(outer_cv.n_splits)
+                for params in candidates
+                for inner in range(inner_cv.n_splits)
+            )
+            inner_scores = np.array([score for score, _ in inner]).reshape(
+                outer_cv.n_splits, len(candidates), inner_cv.n_splits
+            )
+            best = inner_scores.mean(axis=2).argmax(axis=1)
+
+            outer = parallel(
+                delayed(_fit_and_score)(
+                    clone(estimator).set_params(**candidates[best[fold]]), X, y, plan, fold, None, scoring
+                )
+                for fold in range(outer_cv.n_splits)
+            )
+    finally:
+        # release the memory map before its file is removed
+        del X
+        shutil.rmtree(temp_folder, ignore_errors=True)
+
+    return {
+        'outer_scores': np.array([score for score, _ in outer]),
+        'best_params': [candidates[index] for index in best],
+        'candidates': candidates,
+        'inner_scores': inner_scores,
+        'plan': plan,
+    }
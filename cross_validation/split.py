@@ -0,0 +1,95 @@
+from typing import Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def train_test_indices(
+    n_samples: int,
+    test_size: float = 0.2,
+    stratify: Optional[Sequence] = None,
+    random_state: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Shuffle-split sample indices into a training and a test set, optionally stratified.
+
+    Only an index permutation is shuffled, the data itself is never copied or zipped into tuples.
+
+    Args:
+        n_samples (int): number of samples to split.
+        test_size (float, default=0.2): fraction of the samples in the test set.
+        stratify (array-like, default=None): class labels of shape (n_samples,),
+            to keep the class proportions of the test set equal to those of all samples.
+        random_state (int, Generator or None, default=None): seed for a reproducible split.
+
+    Returns:
+        train (ndarray): the training set indices.
+        test (ndarray): the test set indices.
+    """
+    rng = np.random.default_rng(random_state)
+    permutation = rng.permutation(n_samples)
+
+    if stratify is None:
+        split_point = n_samples - int(round(test_size * n_samples))
+        return permutation[:split_point], permutation[split_point:]
+
+    _, y_encoded = np.unique(np.asarray(stratify), return_inverse=True)
+    y_encoded = y_encoded.ravel()
+    # a stable sort of the shuffled indices on their class keeps each class in random order
+    order = permutation[np.argsort(y_encoded[permutation], kind='stable')]
+    counts = np.bincount(y_encoded)
+    class_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    n_test = np.round(test_size * counts).astype(np.int64)
+
+    # the first `n_test` samples of every class go to the test set
+    ordered_classes = y_encoded[order]
+    rank_in_class = np.arange(n_samples) - class_starts[ordered_classes]
+    is_test = np.zeros(n_samples, dtype=bool)
+    is_test[order] = rank_in_class < n_test[ordered_classes]
+
+    # select in the order of the permutation, so both sets stay shuffled instead of sorted by class
+    return permutation[~is_test[permutation]], permutation[is_test[permutation]]
+
+
+def repeated_train_test_indices(
+    n_samples: int,
+    test_size: float = 0.2,
+    n_repeats: int = 10,
+    stratify: Optional[Sequence] = None,
+    random_state: Optional[int] = None,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Generate `n_repeats` independent, reproducible shuffle-splits.
+
+    Args:
+        n_samples (int): number of samples to split.
+        test_size (float, default=0.2): fraction of the samples in the test set.
+        n_repeats (int, default=10): number of splits.
+        stratify (array-like, default=None): class labels of shape (n_samples,).
+        random_state (int or None, default=None): seed for reproducible splits.
+
+    Yields:
+        train (ndarray): the training set indices for that split.
+        test (ndarray): the test set indices for that split.
+    """
+    rng = np.random.default_rng(random_state)
+    for _ in range(n_repeats):
+        yield train_test_indices(n_samples, test_size, stratify, random_state=rng)
+
+
+def take(data: Sequence, indices: np.ndarray) -> Sequence:
+    """Select samples by index from an array or a list.
+
+    Lists, such as tokenized documents, are indexed without copying the samples themselves:
+    the result holds references to the same objects.
+
+    Args:
+        data (array-like): samples to select from.
+        indices (ndarray): indices of the samples to select.
+
+    Returns:
+        array-like: the selected samples, of the same type as `data` for arrays and lists.
+    """
+    if hasattr(data, 'iloc'):
+        return data.iloc[indices]
+    if isinstance(data, np.ndarray) or hasattr(data, 'tocsr'):
+        return data[indices]
+
+    return [data[i] for i in np.asarray(indices).tolist()]
@@ -4,7 +4,8 @@ from typing import Generator, Sequence
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-from cv import BoostedKFold
+import pytest
+from cv import BoostedKFold, RepeatedBoostedKFold, boosted_cross_val_predict, nested_cross_validate
 from sklearn.datasets import make_classification
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score
@@ -20,7 +21,8 @@ def _cross_val_predict(X: Sequence, y: Sequence, y_test: Sequence, splits: Gener
     `cross_val_predict` does what we need, but cannot take test-set that is different in size than y
         which is the case for our BoostedKFold() split
     """
-    y_predictions = np.empty(len(y_test))
+    # predictions by sample index, samples that are never tested (boosted) stay NaN
+    y_predictions = np.full(len(y), np.nan)
     for (training_indices, testing_indices) in splits:
         lr = LogisticRegression(fit_intercept=True)
         lr.fit(X[training_indices], y[training_indices].ravel())
@@ -28,6 +30,7 @@ def _cross_val_predict(X: Sequence, y: Sequence, y_test: Sequence, splits: Gener
 
         for idx_pred, y_pred in zip(testing_indices, y_predict):
             y_predictions[idx_pred] = y_pred
+    y_predictions = y_predictions[~np.isnan(y_predictions)]
 
     plot_evaluation(
         y_test,
@@ -86,6 +89,166 @@ def test_boosted_kfold_unbalanced_dataset():
     _cross_val_predict(X=X, y=y, y_test=y, splits=splits, cv=cv)
 
 
+def test_boosted_kfold_test_fold_matches_stratified_kfold():
+    """Test that the vectorized fold assignment equals StratifiedKFold on the random samples, wherever they are."""
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 3, 1000)
+    # boosted samples interleaved with the random samples, not only at the end
+    groups = np.where(rng.random(len(y)) < 0.2, -1, 0)
+    random_indices = np.where(groups != -1)[0]
+
+    cv = BoostedKFold(n_splits=5, shuffle=True, random_state=42)
+    test_fold = cv.test_fold(y, groups)
+
+    expected = np.full(len(y), -1)
+    skf = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
+    for split_nr, (_, testing_indices) in enumerate(skf.split(y[random_indices], y[random_indices])):
+        expected[random_indices[testing_indices]] = split_nr
+
+    assert test_fold.dtype == np.int8
+    np.testing.assert_array_equal(test_fold, expected)
+    np.testing.assert_array_equal(cv.test_fold(y, groups), test_fold)
+
+
+def test_boosted_kfold_split_never_tests_boosted_samples():
+    """Test that every random sample is tested once and every boosted sample is always trained on."""
+    rng = np.random.default_rng(1)
+    y = rng.integers(0, 2, 500)
+    groups = np.where(rng.random(len(y)) < 0.3, -1, 0)
+
+    tested = []
+    for training_indices, testing_indices in BoostedKFold(n_splits=4, shuffle=True, random_state=0).split(None, y, groups):
+        assert np.all(groups[testing_indices] != -1)
+        assert np.all(np.isin(np.where(groups == -1)[0], training_indices))
+        assert len(np.intersect1d(training_indices, testing_indices)) == 0
+        tested.append(testing_indices)
+
+    np.testing.assert_array_equal(np.sort(np.concatenate(tested)), np.where(groups != -1)[0])
+
+
+def test_boosted_cross_val_predict_matches_sequential_folds():
+    """Test that the parallel out-of-fold predictions equal fitting the folds one by one."""
+    X, y = make_classification(n_samples=600, n_classes=3, n_informative=4, random_state=0)
+    groups = np.where(np.random.default_rng(0).random(len(y)) < 0.2, -1, 0)
+    cv = BoostedKFold(n_splits=3, shuffle=True, random_state=0)
+
+    result = boosted_cross_val_predict(LogisticRegression(), X, y, groups, cv, n_jobs=2)
+
+    expected = np.full(len(y), -1)
+    for training_indices, testing_indices in cv.split(X, y, groups):
+        expected[testing_indices] = LogisticRegression().fit(X[training_indices], y[training_indices]).predict(
+            X[testing_indices]
+        )
+
+    np.testing.assert_array_equal(result['indices'], np.where(groups != -1)[0])
+    np.testing.assert_array_equal(result['predictions'], expected[result['indices']])
+    assert result['probabilities'].shape == (len(result['indices']), 3)
+    np.testing.assert_allclose(result['probabilities'].sum(axis=1), 1)
+    assert len(result['fit_time']) == len(result['predict_time']) == cv.n_splits
+
+
+def test_boosted_kfold_plot_raster_keeps_short_runs():
+    """Test that raster mode bins samples into columns without losing single test, class or boosted samples."""
+    y = np.array([0] * 9 + [1])
+    groups = np.array([0, 0, 0, -1, 0, 0, 0, 0, 0, 0])
+    splits = [
+        (np.setdiff1d(np.arange(10), [1]), np.array([1])),
+        (np.arange(8), np.array([8, 9])),
+    ]
+    cv = BoostedKFold(n_splits=2)
+    fig, ax = plt.subplots()
+
+    cv.plot(None, y, groups, splits, ax, mode='raster', max_bins=5)
+
+    # codes: 0 train, 1 test, 2 unused, 3-4 the classes, 5-6 the groups -1 and 0
+    image = ax.get_images()[0].get_array()
+    np.testing.assert_array_equal(
+        image,
+        [
+            [1, 0, 0, 0, 0],
+            [0, 0, 0, 0, 1],
+            [3, 3, 3, 3, 4],
+            [6, 5, 6, 6, 6],
+        ],
+    )
+
+    # auto mode rasters large datasets
+    fig, ax = plt.subplots()
+    y = np.arange(1500) % 2
+    cv.plot(None, y, np.zeros(1500), list(cv.split(None, y, np.zeros(1500))), ax)
+    assert ax.get_images()[0].get_array().shape == (4, 1500)
+    plt.close('all')
+
+
+def test_repeated_boosted_kfold_reuses_saved_plan(tmp_path):
+    """Test that the fold plan is compact, differs per repetition and is reused from disk."""
+    rng = np.random.default_rng(2)
+    y = rng.integers(0, 2, 300)
+    groups = np.where(rng.random(len(y)) < 0.2, -1, 0)
+    plan_file = str(tmp_path / 'plan.npy')
+
+    cv = RepeatedBoostedKFold(n_splits=3, n_repeats=4, random_state=0, plan_file=plan_file)
+    plan = cv.fold_plan(y, groups)
+    splits = list(cv.split(None, y, groups))
+
+    assert plan.dtype == np.int8 and plan.shape == (4, len(y))
+    assert np.all(plan[:, groups == -1] == -1)
+    assert not np.array_equal(plan[0], plan[1])
+    assert len(splits) == cv.get_n_splits()
+
+    # a rerun without a seed loads the same plan instead of reshuffling
+    rerun = list(RepeatedBoostedKFold(n_splits=3, n_repeats=4, plan_file=plan_file).split(None, y, groups))
+    for (train, test), (rerun_train, rerun_test) in zip(splits, rerun):
+        np.testing.assert_array_equal(train, rerun_train)
+        np.testing.assert_array_equal(test, rerun_test)
+
+    # a plan of another number of folds is rejected instead of yielding empty test sets
+    with pytest.raises(ValueError, match='Remove it'):
+        RepeatedBoostedKFold(n_splits=5, n_repeats=4, plan_file=plan_file).fold_plan(y, groups)
+
+
+def test_nested_cross_validate_never_tests_boosted_samples(tmp_path):
+    """Test that the nested folds exclude boosted samples from every test set and select the best candidate."""
+    X, y = make_classification(n_samples=400, random_state=0)
+    groups = np.where(np.random.default_rng(3).random(len(y)) < 0.2, -1, 0)
+    plan_file = str(tmp_path / 'nested_plan.npy')
+
+    result = nested_cross_validate(
+        LogisticRegression(),
+        {'C': [0.01, 1.0]},
+        X,
+        y,
+        groups,
+        outer_cv=BoostedKFold(n_splits=3, shuffle=True, random_state=0),
+        n_jobs=2,
+        plan_file=plan_file,
+    )
+
+    plan = result['plan']
+    assert plan.shape == (3, len(y))
+    assert np.all(plan[:, groups == -1] == -1)
+    # every random sample is in exactly one outer test set
+    np.testing.assert_array_equal((plan == -2).sum(axis=0), (groups != -1).astype(int))
+
+    assert result['inner_scores'].shape == (3, 2, 3)
+    best = result['inner_scores'].mean(axis=2).argmax(axis=1)
+    assert result['best_params'] == [result['candidates'][index] for index in best]
+    assert np.all((result['outer_scores'] >= 0) & (result['outer_scores'] <= 1))
+
+    # the cached plan of 3 inner folds is rejected for 5 inner folds instead of scoring on empty test sets
+    with pytest.raises(ValueError, match='Remove it'):
+        nested_cross_validate(
+            LogisticRegression(),
+            {'C': [1.0]},
+            X,
+            y,
+            groups,
+            outer_cv=BoostedKFold(n_splits=3, shuffle=True, random_state=0),
+            inner_cv=BoostedKFold(n_splits=5, shuffle=True, random_state=0),
+            plan_file=plan_file,
+        )
+
+
 def main():
     """"""
     test_boosted_kfold_unbalanced_dataset()
@@ -0,0 +1,52 @@
+import numpy as np
+from split import repeated_train_test_indices, take, train_test_indices
+
+
+def test_train_test_indices_partition():
+    """Train and test indices together cover every sample exactly once."""
+    train, test = train_test_indices(1000, test_size=0.2, random_state=0)
+
+    assert len(test) == 200
+    assert np.array_equal(np.sort(np.concatenate([train, test])), np.arange(1000))
+
+
+def test_train_test_indices_stratified_and_seeded():
+    """Stratified splits keep class proportions and are reproducible with a seed."""
+    y = np.array(['a'] * 900 + ['b'] * 100)
+
+    train, test = train_test_indices(len(y), test_size=0.2, stratify=y, random_state=42)
+    train_again, test_again = train_test_indices(len(y), test_size=0.2, stratify=y, random_state=42)
+
+    assert (y[test] == 'b').sum() == 20
+    assert (y[train] == 'b').sum() == 80
+    assert np.array_equal(test, test_again) and np.array_equal(train, train_again)
+
+
+def test_train_test_indices_stratified_shuffled():
+    """Stratified training and test sets are shuffled, not sorted by class."""
+    y = np.repeat(['a', 'b', 'c'], 10)
+
+    train, test = train_test_indices(len(y), test_size=0.2, stratify=y, random_state=0)
+
+    assert [(y[test] == label).sum() for label in 'abc'] == [2, 2, 2]
+    assert not np.array_equal(y[train], np.sort(y[train]))
+    assert not np.array_equal(y[test], np.sort(y[test]))
+
+
+def test_repeated_train_test_indices_differ():
+    """Repeated splits are independent but reproducible as a whole."""
+    splits = [test for _, test in repeated_train_test_indices(100, n_repeats=3, random_state=1)]
+    splits_again = [test for _, test in repeated_train_test_indices(100, n_repeats=3, random_state=1)]
+
+    assert not np.array_equal(splits[0], splits[1])
+    assert all(np.array_equal(a, b) for a, b in zip(splits, splits_again))
+
+
+def test_take_keeps_references():
+    """Lists are indexed without copying the samples themselves."""
+    documents = [['a', 'b'], ['c'], ['d', 'e']]
+
+    selected = take(documents, np.array([2, 0]))
+
+    assert selected == [['d', 'e'], ['a', 'b']]
+    assert selected[0] is documents[2]
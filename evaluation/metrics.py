@@ -0,0 +1,338 @@
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+
+
+def _per_class_metrics(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Computes precision, recall and F1-score per class from one or a stack of confusion matrices.
+
+    Args:
+        matrix (ndarray): confusion matrices of shape (..., n_labels, n_labels), true labels along the rows.
+
+    Returns:
+        precision, recall, f1 (ndarray): of shape (..., n_labels), 0 where undefined.
+        accuracy (ndarray): of shape (...).
+    """
+    true_positives = np.diagonal(matrix, axis1=-2, axis2=-1).astype(float)
+    support = matrix.sum(axis=-1)
+    precision, recall, f1 = _precision_recall_f1(true_positives, support, matrix.sum(axis=-2))
+
+    n_samples = support.sum(axis=-1)
+    accuracy = np.divide(true_positives.sum(axis=-1), n_samples, out=np.zeros(n_samples.shape), where=n_samples > 0)
+
+    return precision, recall, f1, accuracy
+
+
+def _precision_recall_f1(
+    true_positives: np.ndarray, support: np.ndarray, predicted: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Computes precision, recall and F1-score from the per-class counts, 0 where undefined."""
+    true_positives = true_positives.astype(float)
+    precision = np.divide(true_positives, predicted, out=np.zeros(true_positives.shape), where=predicted > 0)
+    recall = np.divide(true_positives, support, out=np.zeros(true_positives.shape), where=support > 0)
+    denominator = precision + recall
+    f1 = np.divide(2 * precision * recall, denominator, out=np.zeros(denominator.shape), where=denominator > 0)
+
+    return precision, recall, f1
+
+
+class StreamingConfusionMatrix:
+    def __init__(self, labels: Optional[Sequence] = None):
+        """Accumulates a confusion matrix over batches of predictions, in memory independent of their number.
+
+        Batches can come from cross-validation folds, data shards or a stream. Accumulators of different
+        processes are combined with ``merge`` or ``+``.
+
+        Args:
+            labels (array-like, default=None): all class labels, if known up front.
+                Otherwise the labels are collected from the batches, and the matrix grows with every new label.
+        """
+        self.labels = np.array([]) if labels is None else np.unique(labels)
+        self.matrix = np.zeros((len(self.labels), len(self.labels)), dtype=np.int64)
+
+    def _add_labels(self, labels: np.ndarray) -> None:
+        """Extend the matrix with the labels that were not seen before, keeping the labels sorted."""
+        all_labels = np.union1d(self.labels, labels) if len(self.labels) else np.unique(labels)
+        if len(all_labels) == len(self.labels):
+            return
+
+        matrix = np.zeros((len(all_labels), len(all_labels)), dtype=np.int64)
+        position = np.searchsorted(all_labels, self.labels)
+        matrix[np.ix_(position, position)] = self.matrix
+        self.labels, self.matrix = all_labels, matrix
+
+    def update(self, y: Sequence, y_predict: Sequence) -> 'StreamingConfusionMatrix':
+        """Add a batch of true and predicted labels.
+
+        Args:
+            y (array-like): true labels of shape (n_samples,).
+            y_predict (array-like): predicted labels of shape (n_samples,).
+
+        Returns:
+            StreamingConfusionMatrix: itself, to chain updates.
+        """
+        y, y_predict = np.asarray(y).ravel(), np.asarray(y_predict).ravel()
+        if len(y) != len(y_predict):
+            raise ValueError(f'y has {len(y)} samples, but y_predict has {len(y_predict)}.')
+        if not len(y):
+            return self
+
+        self._add_labels(np.concatenate((np.unique(y), np.unique(y_predict))))
+
+        # encode every (true, predicted) pair as one cell index and count the cells at once
+        n_labels = len(self.labels)
+        cells = np.searchsorted(self.labels, y) * n_labels + np.searchsorted(self.labels, y_predict)
+        self.matrix += np.bincount(cells, minlength=n_labels * n_labels).reshape(n_labels, n_labels)
+
+        return self
+
+    def merge(self, other: 'StreamingConfusionMatrix') -> 'StreamingConfusionMatrix':
+        """Add the counts of another accumulator, e.g. of another fold or process.
+
+        Args:
+            other (StreamingConfusionMatrix): the accumulator to add.
+
+        Returns:
+            StreamingConfusionMatrix: itself, to chain merges.
+        """
+        self._add_labels(other.labels)
+        position = np.searchsorted(self.labels, other.labels)
+        self.matrix[np.ix_(position, position)] += other.matrix
+
+        return self
+
+    def __add__(self, other: 'StreamingConfusionMatrix') -> 'StreamingConfusionMatrix':
+        return StreamingConfusionMatrix(self.labels).merge(self).merge(other)
+
+    @property
+    def n_samples(self) -> int:
+        """Number of predictions added."""
+        return int(self.matrix.sum())
+
+    @property
+    def accuracy(self) -> float:
+        """Fraction of correct predictions."""
+        return float(_per_class_metrics(self.matrix)[3])
+
+    def confusion_frame(self) -> pd.DataFrame:
+        """Returns the confusion matrix, with the true labels as index and the predicted labels as columns."""
+        return pd.DataFrame(self.matrix, index=self.labels, columns=self.labels)
+
+    def report(self, averages: bool = False) -> pd.DataFrame:
+        """Derive the per-class precision, recall, F1-score and support, as ``classification_report`` does.
+
+        Precision and recall without predicted or true samples are 0, like scikit-learn's `zero_division` default.
+
+        Args:
+            averages (bool, default=False): whether to append the 'macro avg' and 'weighted avg' rows.
+
+        Returns:
+            DataFrame: precision, recall, f1-score and support per class label.
+        """
+        precision, recall, f1, _ = _per_class_metrics(self.matrix)
+        support = self.matrix.sum(axis=1)
+
+        df = pd.DataFrame(
+            {'precision': precision, 'recall': recall, 'f1-score': f1, 'support': support.astype(float)},
+            index=self.labels,
+        )
+        if averages:
+            metrics = df[['precision', 'recall', 'f1-score']]
+            weights = support / support.sum() if support.sum() else np.zeros(len(support))
+            df.loc['macro avg'] = [*metrics.mean(), support.sum()]
+            df.loc['weighted avg'] = [*(metrics.T @ weights), support.sum()]
+
+        return df
+
+    def bootstrap(
+        self,
+        n_bootstrap: int = 1000,
+        confidence: float = 0.95,
+        chunk_size: int = 500,
+        random_state: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """Estimates percentile bootstrap confidence intervals of the per-class metrics and the accuracy.
+
+        Resampling the predictions with replacement is equivalent to drawing the counts of the confusion cells from a
+        multinomial distribution, so every resample is one row of a weight matrix over the cells instead of a copy
+        of the predictions. The metrics of a chunk of resamples are computed at once, memory is bounded by
+        `chunk_size` * n_labels ** 2 counts.
+
+        Args:
+            n_bootstrap (int, default=1000): number of resamples.
+            confidence (float, default=0.95): coverage of the intervals.
+            chunk_size (int, default=500): number of resamples drawn at once.
+            random_state (int, default=None): seed for reproducible intervals.
+
+        Returns:
+            DataFrame: the lower and upper bound of the precision, recall and f1-score per class label,
+                and an 'accuracy' row with the bounds of the accuracy in every column.
+        """
+        rng = np.random.default_rng(random_state)
+        n_labels, n_samples = len(self.labels), self.n_samples
+        cell_probabilities = self.matrix.ravel() / n_samples
+
+        metrics = np.empty((4, n_bootstrap, n_labels))
+        for start in range(0, n_bootstrap, chunk_size):
+            size = min(chunk_size, n_bootstrap - start)
+            counts = rng.multinomial(n_samples, cell_probabilities, size=size).reshape(size, n_labels, n_labels)
+            precision, recall, f1, accuracy = _per_class_metrics(counts)
+            chunk = slice(start, start + size)
+            metrics[0, chunk], metrics[1, chunk], metrics[2, chunk] = precision, recall, f1
+            metrics[3, chunk] = accuracy[:, np.newaxis]
+
+        alpha = (1 - confidence) / 2
+        lower, upper = np.quantile(metrics, [alpha, 1 - alpha], axis=1)
+
+        index = [*self.labels, 'accuracy']
+        columns = {}
+        for i, name in enumerate(['precision', 'recall', 'f1-score']):
+            columns[f'{name} lower'] = [*lower[i], lower[3, 0]]
+            columns[f'{name} upper'] = [*upper[i], upper[3, 0]]
+
+        return pd.DataFrame(columns, index=index)
+
+
+class SparseConfusionMatrix:
+    def __init__(self):
+        """Accumulates a confusion matrix as (true, predicted) pair counts, for label spaces too large for a dense matrix.
+
+        Memory grows with the number of distinct (true, predicted) pairs instead of the number of labels squared.
+        Every pair is one int64 key, the code of the true label shifted 32 bits left plus the code of the predicted
+        label. Labels are coded in order of first appearance, so new labels never change existing keys.
+        """
+        self.labels = np.array([])
+        self.keys = np.array([], dtype=np.int64)
+        self.counts = np.array([], dtype=np.int64)
+
+    def _encode(self, values: np.ndarray) -> np.ndarray:
+        """Returns the code of every value, adding the values that were not seen before to the labels."""
+        unique = np.unique(values)
+        if len(self.labels):
+            unique = unique[~np.isin(unique, self.labels)]
+        if len(unique):
+            self.labels = np.concatenate((self.labels, unique)) if len(self.labels) else unique
+
+        sorter = np.argsort(self.labels, kind='stable')
+        return sorter[np.searchsorted(self.labels, values, sorter=sorter)].astype(np.int64)
+
+    def _add_pairs(self, keys: np.ndarray, counts: np.ndarray) -> None:
+        """Add counts per key to the accumulated counts."""
+        keys, inverse = np.unique(np.concatenate((self.keys, keys)), return_inverse=True)
+        self.counts = np.bincount(inverse, weights=np.concatenate((self.counts, counts))).astype(np.int64)
+        self.keys = keys
+
+    def update(self, y: Sequence, y_predict: Sequence) -> 'SparseConfusionMatrix':
+        """Add a batch of true and predicted labels.
+
+        Args:
+            y (array-like): true labels of shape (n_samples,).
+            y_predict (array-like): predicted labels of shape (n_samples,).
+
+        Returns:
+            SparseConfusionMatrix: itself, to chain updates.
+        """
+        y, y_predict = np.asarray(y).ravel(), np.asarray(y_predict).ravel()
+        if len(y) != len(y_predict):
+            raise ValueError(f'y has {len(y)} samples, but y_predict has {len(y_predict)}.')
+        if not len(y):
+            return self
+
+        keys = (self._encode(y) << 32) | self._encode(y_predict)
+        self._add_pairs(*np.unique(keys, return_counts=True))
+
+        return self
+
+    def merge(self, other: 'SparseConfusionMatrix') -> 'SparseConfusionMatrix':
+        """Add the counts of another accumulator, e.g. of another fold or process.
+
+        Args:
+            other (SparseConfusionMatrix): the accumulator to add.
+
+        Returns:
+            SparseConfusionMatrix: itself, to chain merges.
+        """
+        if len(other.labels):
+            codes = self._encode(other.labels)
+            true, predicted = other.pairs()
+            self._add_pairs((codes[true] << 32) | codes[predicted], other.counts)
+
+        return self
+
+    def __add__(self, other: 'SparseConfusionMatrix') -> 'SparseConfusionMatrix':
+        return SparseConfusionMatrix().merge(self).merge(other)
+
+    def pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the codes of the true and of the predicted label of every distinct pair, in the order of `counts`."""
+        return self.keys >> 32, self.keys & 0xFFFFFFFF
+
+    @property
+    def n_samples(self) -> int:
+        """Number of predictions added."""
+        return int(self.counts.sum())
+
+    @property
+    def accuracy(self) -> float:
+        """Fraction of correct predictions."""
+        true, predicted = self.pairs()
+        return float(self.counts[true == predicted].sum() / self.n_samples) if self.n_samples else 0.0
+
+    def to_coo(self) -> coo_matrix:
+        """Returns the confusion matrix as a scipy COO matrix, rows and columns in the order of `labels`."""
+        true, predicted = self.pairs()
+        return coo_matrix((self.counts, (true, predicted)), shape=(len(self.labels), len(self.labels)))
+
+    def report(self) -> pd.DataFrame:
+        """Derive the per-class precision, recall, F1-score and support, as ``classification_report`` does.
+
+        Returns:
+            DataFrame: precision, recall, f1-score and support per class label, sorted by label.
+        """
+        true, predicted = self.pairs()
+        n_labels = len(self.labels)
+        correct = true == predicted
+        true_positives = np.bincount(true[correct], weights=self.counts[correct], minlength=n_labels)
+        support = np.bincount(true, weights=self.counts, minlength=n_labels)
+        precision, recall, f1 = _precision_recall_f1(
+            true_positives, support, np.bincount(predicted, weights=self.counts, minlength=n_labels)
+        )
+
+        df = pd.DataFrame(
+            {'precision': precision, 'recall': recall, 'f1-score': f1, 'support': support}, index=self.labels
+        )
+
+        return df.sort_index()
+
+    def most_confused(self, n: int = 20) -> pd.DataFrame:
+        """Returns the `n` most frequent (true, predicted) pairs of misclassifications.
+
+        Args:
+            n (int, default=20): number of pairs.
+
+        Returns:
+            DataFrame: true label, predicted label and count per pair, most frequent first.
+        """
+        true, predicted = self.pairs()
+        wrong = np.flatnonzero(true != predicted)
+        top = wrong[np.argsort(-self.counts[wrong], kind='stable')[:n]]
+
+        return pd.DataFrame(
+            {'true': self.labels[true[top]], 'predicted': self.labels[predicted[top]], 'count': self.counts[top]}
+        )
+
+    def worst_classes(self, n: int = 20, metric: str = 'f1-score') -> pd.DataFrame:
+        """Returns the `n` classes with the lowest `metric` among the classes with true samples.
+
+        Args:
+            n (int, default=20): number of classes.
+            metric (str, default='f1-score'): 'precision', 'recall' or 'f1-score'.
+
+        Returns:
+            DataFrame: the report rows of the worst classes, worst first.
+        """
+        report = self.report()
+        report = report[report['support'] > 0]
+
+        return report.sort_values([metric, 'support'], ascending=[True, False]).head(n)
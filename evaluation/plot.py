@@ -1,26 +1,85 @@
-from typing import Sequence
+import html
+import os
+import re
+from typing import Dict, Optional, Sequence, Tuple, Union
 
 import matplotlib.pyplot as plt
-import numpy as np
 import pandas as pd
 import seaborn as sns
-from sklearn.metrics import classification_report, confusion_matrix
+from joblib import Parallel, delayed
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from metrics import SparseConfusionMatrix, StreamingConfusionMatrix
 
 
-def plot_evaluation(y: Sequence, y_predict: Sequence, title: str = 'CV', cmap: str = 'crest') -> None:
-    """Plots the classification report and the confusion matrix."""
-    labels = np.unique(y)
+def plot_evaluation(
+    y: Sequence,
+    y_predict: Sequence,
+    title: str = 'CV',
+    cmap: str = 'crest',
+    output_file: Optional[str] = None,
+    n_bootstrap: int = 0,
+) -> None:
+    """Plots the classification report and the confusion matrix.
+
+    Args:
+        output_file (str, default=None): .png or .svg file to render to without a display, instead of showing the plot.
+        n_bootstrap (int, default=0): number of bootstrap resamples for 95% confidence intervals in the report,
+            no intervals if 0.
+    """
+    plot_confusion_evaluation(
+        StreamingConfusionMatrix().update(y, y_predict),
+        title=title,
+        cmap=cmap,
+        output_file=output_file,
+        n_bootstrap=n_bootstrap,
+    )
 
-    conf_matrix = confusion_matrix(y, y_predict)
-    df_cm = pd.DataFrame(conf_matrix, index=labels, columns=labels)
 
-    clf_report = classification_report(y, y_predict, output_dict=True)
-    df_clf = pd.DataFrame(clf_report).iloc[:, :-3].T
+def plot_confusion_evaluation(
+    confusion: StreamingConfusionMatrix,
+    title: str = 'CV',
+    cmap: str = 'crest',
+    output_file: Optional[str] = None,
+    n_bootstrap: int = 0,
+) -> None:
+    """Plots the classification report and the confusion matrix of predictions accumulated over folds or shards.
+
+    Args:
+        output_file (str, default=None): .png or .svg file to render to without a display, instead of showing the plot.
+        n_bootstrap (int, default=0): number of bootstrap resamples for 95% confidence intervals in the report,
+            no intervals if 0.
+    """
+    if output_file:
+        _default_renderer(cmap).render(confusion, output_file, title=title, n_bootstrap=n_bootstrap)
+        return
 
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 5))
     fig.suptitle(title)
+    _draw_evaluation(confusion, ax1, ax2, cmap, n_bootstrap=n_bootstrap)
+    plt.show()
+
 
-    hm1 = sns.heatmap(df_cm, annot=True, fmt='g', cmap=cmap, ax=ax1)
+def _report_annotations(df_clf: pd.DataFrame, intervals: pd.DataFrame) -> pd.DataFrame:
+    """Annotates every metric with its confidence interval below it."""
+    annotations = df_clf.round(2).astype(str)
+    for metric in ['precision', 'recall', 'f1-score']:
+        lower = intervals.loc[df_clf.index, f'{metric} lower'].round(2).astype(str)
+        upper = intervals.loc[df_clf.index, f'{metric} upper'].round(2).astype(str)
+        annotations[metric] = annotations[metric] + '\n[' + lower + ', ' + upper + ']'
+    annotations['support'] = df_clf['support'].astype(int).astype(str)
+
+    return annotations
+
+
+def _draw_evaluation(
+    confusion: StreamingConfusionMatrix, ax1, ax2, cmap, cbar_ax1=None, cbar_ax2=None, n_bootstrap: int = 0
+) -> None:
+    """Draws the confusion matrix on `ax1` and the classification report on `ax2`."""
+    df_cm = confusion.confusion_frame()
+    df_clf = confusion.report()
+
+    hm1 = sns.heatmap(df_cm, annot=True, fmt='g', cmap=cmap, ax=ax1, cbar_ax=cbar_ax1)
     hm1.set(title='Confusion matrix', xlabel='Predicted', ylabel='True')
 
     # adjusts the heatmap so that the `support` column is white,
@@ -29,15 +88,193 @@ def plot_evaluation(y: Sequence, y_predict: Sequence, title: str = 'CV', cmap: s
     cmap = plt.get_cmap(cmap)
     cmap.set_over('white')
 
+    report_title = 'Classification report'
+    annot, fmt = df_clf.round(2), '.5g'
+    if n_bootstrap:
+        intervals = confusion.bootstrap(n_bootstrap)
+        annot, fmt = _report_annotations(df_clf, intervals), ''
+        accuracy = intervals.loc['accuracy']
+        report_title += (
+            f' with 95% CI, accuracy {confusion.accuracy:.2f} '
+            f'[{accuracy["precision lower"]:.2f}, {accuracy["precision upper"]:.2f}]'
+        )
+
     hm2 = sns.heatmap(
         data=df_clf.copy(),
         xticklabels=df_clf.columns,
         yticklabels=df_clf.index,
-        annot=df_clf.round(2),
+        annot=annot,
         cmap=cmap,
         ax=ax2,
+        cbar_ax=cbar_ax2,
         norm=norm,
-        fmt='.5g',
+        fmt=fmt,
     )
-    hm2.set(title='Classification report')
-    plt.show()
+    hm2.set(title=report_title)
+
+
+def plot_sparse_evaluation(
+    confusion: SparseConfusionMatrix,
+    top_n: int = 20,
+    title: str = 'CV',
+    cmap: str = 'crest',
+    output_file: Optional[str] = None,
+) -> None:
+    """Plots the most confused label pairs and the worst classes, for label spaces too large for a heatmap.
+
+    Args:
+        confusion (SparseConfusionMatrix): the accumulated predictions.
+        top_n (int, default=20): number of label pairs and of classes to show.
+        title (str, default='CV'): title above both charts.
+        cmap (str, default='crest'): colormap of the bars.
+        output_file (str, default=None): .png or .svg file to render to without a display, instead of showing the plot.
+    """
+    if output_file:
+        fig = Figure(figsize=(15, max(5, 0.3 * top_n)))
+        FigureCanvasAgg(fig)
+        ax1, ax2 = fig.subplots(1, 2)
+    else:
+        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, max(5, 0.3 * top_n)))
+    fig.suptitle(f'{title}, {len(confusion.labels)} labels, accuracy {confusion.accuracy:.3f}')
+    colors = plt.get_cmap(cmap)
+
+    pairs = confusion.most_confused(top_n)
+    ax1.barh(
+        pairs['true'].astype(str) + ' → ' + pairs['predicted'].astype(str),
+        pairs['count'],
+        color=colors(0.7),
+    )
+    ax1.invert_yaxis()
+    ax1.set(title=f'Top {len(pairs)} confused label pairs', xlabel='Count', ylabel='True → Predicted')
+
+    worst = confusion.worst_classes(top_n)
+    ax2.barh(worst.index.astype(str), worst['f1-score'], color=colors(worst['recall'].to_numpy()))
+    for position, (f1, support) in enumerate(zip(worst['f1-score'], worst['support'])):
+        ax2.text(f1, position, f' {f1:.2f} (n={int(support)})', va='center')
+    ax2.invert_yaxis()
+    ax2.set(title=f'Worst {len(worst)} classes, colored by recall', xlabel='F1-score', xlim=(0, 1))
+
+    fig.tight_layout()
+    if output_file:
+        fig.savefig(output_file)
+    else:
+        plt.show()
+
+
+class EvaluationRenderer:
+    def __init__(self, cmap: str = 'crest', figsize: Tuple[float, float] = (15, 5), dpi: int = 100):
+        """Renders evaluations to image files without a display, reusing one figure and its axes for every render.
+
+        The figure is drawn by the Agg canvas directly, so neither pyplot's global state nor a GUI backend is involved.
+
+        Args:
+            cmap (str or Colormap, default='crest'): colormap of the heatmaps.
+            figsize (tuple, default=(15, 5)): figure size in inches.
+            dpi (int, default=100): resolution of .png files.
+        """
+        self.cmap = cmap
+        self.dpi = dpi
+        self.fig = Figure(figsize=figsize)
+        FigureCanvasAgg(self.fig)
+        # fixed axes for the heatmaps and their colorbars, so clearing them does not shrink the heatmaps every render
+        self.ax1 = self.fig.add_axes([0.06, 0.12, 0.34, 0.76])
+        self.cbar_ax1 = self.fig.add_axes([0.41, 0.12, 0.012, 0.76])
+        self.ax2 = self.fig.add_axes([0.53, 0.12, 0.34, 0.76])
+        self.cbar_ax2 = self.fig.add_axes([0.88, 0.12, 0.012, 0.76])
+
+    def render(
+        self, confusion: StreamingConfusionMatrix, output_file: str, title: str = 'CV', n_bootstrap: int = 0
+    ) -> str:
+        """Renders the confusion matrix and classification report to a file.
+
+        Args:
+            confusion (StreamingConfusionMatrix): the accumulated predictions.
+            output_file (str): file path, the extension selects the format, e.g. .png or .svg.
+            title (str, default='CV'): title above both heatmaps.
+            n_bootstrap (int, default=0): number of bootstrap resamples for 95% confidence intervals in the report.
+
+        Returns:
+            str: the file path.
+        """
+        for ax in (self.ax1, self.cbar_ax1, self.ax2, self.cbar_ax2):
+            ax.clear()
+        self.fig.suptitle(title)
+        _draw_evaluation(confusion, self.ax1, self.ax2, self.cmap, self.cbar_ax1, self.cbar_ax2, n_bootstrap)
+        self.fig.savefig(output_file, dpi=self.dpi)
+
+        return output_file
+
+
+_renderers: Dict[str, EvaluationRenderer] = {}
+
+
+def _default_renderer(cmap) -> EvaluationRenderer:
+    """Returns the renderer of this process for a colormap, creating it on first use."""
+    key = cmap if isinstance(cmap, str) else getattr(cmap, 'name', repr(cmap))
+    if key not in _renderers:
+        _renderers[key] = EvaluationRenderer(cmap=cmap)
+
+    return _renderers[key]
+
+
+def _render_chunk(evaluations: Sequence[Tuple[str, StreamingConfusionMatrix, str]], cmap, n_bootstrap: int) -> None:
+    """Renders a chunk of evaluations in a worker process, with one renderer for the whole chunk."""
+    renderer = EvaluationRenderer(cmap=cmap)
+    for name, confusion, output_file in evaluations:
+        renderer.render(confusion, output_file, title=name, n_bootstrap=n_bootstrap)
+
+
+def render_reports(
+    evaluations: Dict[str, Union[StreamingConfusionMatrix, Tuple[Sequence, Sequence]]],
+    output_dir: str,
+    image_format: str = 'png',
+    cmap: str = 'crest',
+    n_jobs: int = -1,
+    n_bootstrap: int = 0,
+) -> str:
+    """Renders the evaluation of many models in parallel worker processes, with an HTML index page of all reports.
+
+    Args:
+        evaluations (dict): per model name, a StreamingConfusionMatrix or a (y, y_predict) tuple.
+        output_dir (str): directory for the images and the index page.
+        image_format (str, default='png'): 'png' or 'svg'.
+        cmap (str, default='crest'): colormap of the heatmaps.
+        n_jobs (int, default=-1): number of worker processes, -1 uses all cores.
+        n_bootstrap (int, default=0): number of bootstrap resamples for 95% confidence intervals in the reports.
+
+    Returns:
+        str: the file path of the index page.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    # only the small confusion matrices are sent to the workers, not the predictions
+    reports = []
+    for name, evaluation in evaluations.items():
+        if isinstance(evaluation, tuple):
+            evaluation = StreamingConfusionMatrix().update(*evaluation)
+        file_name = f'{len(reports):04d}_{re.sub(r"[^A-Za-z0-9_.-]+", "_", name)}.{image_format}'
+        reports.append((name, evaluation, os.path.join(output_dir, file_name)))
+
+    n_workers = min(len(reports), os.cpu_count() if n_jobs < 0 else n_jobs) or 1
+    chunks = [reports[worker::n_workers] for worker in range(n_workers)]
+    Parallel(n_jobs=n_workers)(delayed(_render_chunk)(chunk, cmap, n_bootstrap) for chunk in chunks if chunk)
+
+    rows = '\n'.join(
+        f'<tr><td><a href="#{index}">{html.escape(name)}</a></td><td>{confusion.accuracy:.3f}</td>'
+        f'<td>{confusion.n_samples}</td></tr>'
+        for index, (name, confusion, _) in enumerate(reports)
+    )
+    figures = '\n'.join(
+        f'<h2 id="{index}">{html.escape(name)}</h2>\n<img src="{html.escape(os.path.basename(output_file))}" '
+        f'alt="{html.escape(name)}">'
+        for index, (name, _, output_file) in enumerate(reports)
+    )
+    index_file = os.path.join(output_dir, 'index.html')
+    with open(index_file, 'w', encoding='utf-8') as f:
+        f.write(
+            '<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"><title>Evaluation reports</title></head>\n<body>\n'
+            '<h1>Evaluation reports</h1>\n<table>\n<tr><th>Model</th><th>Accuracy</th><th>Samples</th></tr>\n'
+            f'{rows}\n</table>\n{figures}\n</body>\n</html>\n'
+        )
+
+    return index_file
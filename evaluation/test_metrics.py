@@ -0,0 +1,82 @@
+import numpy as np
+from metrics import SparseConfusionMatrix, StreamingConfusionMatrix
+from sklearn.metrics import classification_report, confusion_matrix
+
+
+def test_streaming_confusion_matrix_equals_sklearn():
+    """Test that batches, merged across accumulators, give scikit-learn's confusion matrix and report."""
+    rng = np.random.default_rng(0)
+    y_true = rng.choice(['books', 'camera', 'dvd', 'music'], size=1000)
+    y_predict = np.where(rng.random(1000) < 0.7, y_true, rng.choice(['books', 'camera', 'dvd', 'health'], size=1000))
+
+    # two "processes" that each see some labels only later on
+    first, second = StreamingConfusionMatrix(), StreamingConfusionMatrix()
+    for start in range(0, 500, 100):
+        first.update(y_true[start : start + 100], y_predict[start : start + 100])
+    second.update(y_true[500:], y_predict[500:])
+    confusion = first + second
+
+    labels = np.unique(np.concatenate((y_true, y_predict)))
+    np.testing.assert_array_equal(confusion.labels, labels)
+    np.testing.assert_array_equal(confusion.matrix, confusion_matrix(y_true, y_predict, labels=labels))
+    assert confusion.n_samples == 1000
+
+    expected = classification_report(y_true, y_predict, output_dict=True, zero_division=0)
+    report = confusion.report(averages=True)
+    for label in [*labels, 'macro avg', 'weighted avg']:
+        for metric in ['precision', 'recall', 'f1-score', 'support']:
+            np.testing.assert_allclose(report.loc[label, metric], expected[label][metric])
+    np.testing.assert_allclose(confusion.accuracy, expected['accuracy'])
+
+
+def test_bootstrap_intervals_contain_point_estimates():
+    """Test that the bootstrap intervals are ordered, reproducible and contain the point estimates."""
+    rng = np.random.default_rng(1)
+    y_true = rng.integers(0, 3, 2000)
+    y_predict = np.where(rng.random(2000) < 0.8, y_true, rng.integers(0, 3, 2000))
+    confusion = StreamingConfusionMatrix().update(y_true, y_predict)
+
+    intervals = confusion.bootstrap(n_bootstrap=500, chunk_size=128, random_state=0)
+    report = confusion.report()
+
+    for metric in ['precision', 'recall', 'f1-score']:
+        lower, upper = intervals.loc[report.index, f'{metric} lower'], intervals.loc[report.index, f'{metric} upper']
+        assert np.all(lower <= report[metric]) and np.all(report[metric] <= upper)
+    assert intervals.loc['accuracy', 'precision lower'] <= confusion.accuracy <= intervals.loc['accuracy', 'precision upper']
+    assert intervals.equals(confusion.bootstrap(n_bootstrap=500, chunk_size=128, random_state=0))
+
+
+def test_sparse_confusion_matrix_equals_dense():
+    """Test that the sparse accumulator, merged across batches with new labels, equals the dense one."""
+    rng = np.random.default_rng(2)
+    labels = np.array([f'category_{i}' for i in range(300)])
+    y_true = labels[rng.integers(0, 300, 5000)]
+    y_predict = np.where(rng.random(5000) < 0.6, y_true, labels[rng.integers(0, 300, 5000)])
+
+    sparse = SparseConfusionMatrix().update(y_true[:100], y_predict[:100]) + SparseConfusionMatrix().update(
+        y_true[100:], y_predict[100:]
+    )
+    dense = StreamingConfusionMatrix().update(y_true, y_predict)
+
+    assert len(sparse.keys) < len(sparse.labels) ** 2
+    assert sparse.accuracy == dense.accuracy
+    np.testing.assert_allclose(sparse.report().to_numpy(), dense.report().to_numpy())
+
+    order = np.argsort(sparse.labels)
+    np.testing.assert_array_equal(sparse.to_coo().toarray()[np.ix_(order, order)], dense.matrix)
+
+    pairs = sparse.most_confused(5)
+    assert np.all(pairs['true'] != pairs['predicted'])
+    cells = dense.confusion_frame()
+    assert pairs['count'].iloc[0] == (cells.to_numpy() - np.diag(np.diag(cells.to_numpy()))).max()
+
+
+def main():
+    """"""
+    test_streaming_confusion_matrix_equals_sklearn()
+    test_bootstrap_intervals_contain_point_estimates()
+    test_sparse_confusion_matrix_equals_dense()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import numpy as np
 import seaborn as sns
-from plot import plot_evaluation
+from metrics import StreamingConfusionMatrix
+from plot import EvaluationRenderer, plot_evaluation, render_reports
 
 
 def test_plot_evaluation():
@@ -11,6 +12,39 @@ def test_plot_evaluation():
     plot_evaluation(y_true, y_predict, title='Beautiful evaluation metrics', cmap=sns.cubehelix_palette(as_cmap=True))
 
 
+def test_render_reports(tmp_path):
+    """Test that the reports of several models are rendered in parallel, with one index row per model."""
+    rng = np.random.default_rng(0)
+    y_true = rng.integers(0, 3, 500)
+    evaluations = {
+        'naive bayes': (y_true, np.where(rng.random(500) < 0.8, y_true, rng.integers(0, 3, 500))),
+        'baseline': (y_true, np.zeros(500, dtype=int)),
+        'accumulated': StreamingConfusionMatrix().update(y_true[:250], y_true[:250]).update(y_true[250:], y_true[250:]),
+    }
+
+    index_file = render_reports(evaluations, str(tmp_path), n_jobs=2)
+
+    images = sorted(path.name for path in tmp_path.glob('*.png'))
+    assert images == ['0000_naive_bayes.png', '0001_baseline.png', '0002_accumulated.png']
+    with open(index_file, encoding='utf-8') as f:
+        index = f.read()
+    assert index.count('<tr><td>') == len(evaluations)
+    assert 'naive bayes' in index and 'baseline' in index
+    assert '<td>1.000</td><td>500</td>' in index
+
+
+def test_evaluation_renderer_reuses_axes(tmp_path):
+    """Test that renders through one renderer reuse its figure and axes."""
+    renderer = EvaluationRenderer()
+    axes = list(renderer.fig.axes)
+
+    for name, y_predict in [('first', [0, 1, 1, 0]), ('second', [0, 0, 1, 2])]:
+        output_file = str(tmp_path / f'{name}.svg')
+        assert renderer.render(StreamingConfusionMatrix().update([0, 1, 1, 2], y_predict), output_file) == output_file
+        assert (tmp_path / f'{name}.svg').stat().st_size > 0
+        assert renderer.fig.axes == axes
+
+
 def main():
     """"""
     test_plot_evaluation()
@@ -12,6 +12,77 @@ from sklearn.metrics import cohen_kappa_score
 from statsmodels.stats.inter_rater import fleiss_kappa
 
 
+def encode_annotations(annotations, missing=None):
+    """Label-encodes the annotations of all annotators into one integer matrix.
+
+    :param annotations: annotations per annotator, shorter lists are missing their last items
+    :type annotations: dict of lists
+    :param missing: value for a missing annotation, besides None and NaN
+    :type missing: object
+
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    :return: matrix of shape (annotators, items) with the category code per annotation or -1 if missing,
+        and the categories in the order of their codes, which is the order of first appearance
+    """
+    columns = {annotator: pd.Series(labels) for annotator, labels in annotations.items()}
+    if missing is not None:
+        columns = {annotator: labels.replace(missing, None) for annotator, labels in columns.items()}
+
+    categories = pd.Index(np.concatenate([labels.dropna().unique() for labels in columns.values()])).unique()
+
+    n_items = max(len(labels) for labels in columns.values())
+    dtype = np.int8 if len(categories) < np.iinfo(np.int8).max else np.int32
+    codes = np.full((len(columns), n_items), -1, dtype=dtype)
+    for i, labels in enumerate(columns.values()):
+        codes[i, : len(labels)] = pd.Categorical(labels, categories=categories).codes
+
+    return codes, categories.to_numpy()
+
+
+def cohen_kappa_matrix(annotations, missing=None, chunk_size=65536):
+    """Computes Cohen kappa for all pairs of annotators at once.
+
+    Each pair is compared on the items both annotated. With one indicator matrix per category, a matrix product
+    counts the agreements, and the category counts of one annotator on the items of the other, of all pairs at once.
+
+    :param annotations: annotations per annotator, shorter lists are missing their last items
+    :type annotations: dict of lists
+    :param missing: value for a missing annotation, besides None and NaN
+    :type missing: object
+    :param chunk_size: number of items per matrix product, bounds the memory of the indicator matrices
+    :type chunk_size: int
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: annotator x annotator matrix of Cohen kappa statistics, NaN for pairs without variation
+    """
+    codes, categories = encode_annotations(annotations, missing)
+    n_annotators, n_items = codes.shape
+
+    agreement = np.zeros((n_annotators, n_annotators))  # items both annotated with the same category
+    shared = np.zeros((n_annotators, n_annotators))  # items both annotated
+    # annotations of category c by the row annotator, on the items annotated by the column annotator
+    category_counts = np.zeros((len(categories), n_annotators, n_annotators))
+
+    # float32 products count exactly up to 2 ** 24 items per chunk
+    chunk_size = min(chunk_size, 2 ** 24)
+    for start in range(0, n_items, chunk_size):
+        chunk = codes[:, start : start + chunk_size]
+        annotated = (chunk >= 0).astype(np.float32)
+        shared += annotated @ annotated.T
+        for c in range(len(categories)):
+            indicator = (chunk == c).astype(np.float32)
+            agreement += indicator @ indicator.T
+            category_counts[c] += indicator @ annotated.T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        observed = agreement / shared  # observed agreement A (Po)
+        # expected agreement E (Pe): the product of both annotators' category distributions on their shared items
+        expected = np.sum(category_counts * category_counts.transpose(0, 2, 1), axis=0) / shared ** 2
+        kappa = (observed - expected) / (1 - expected)
+
+    return pd.DataFrame(kappa, index=list(annotations), columns=list(annotations))
+
+
 def cohen_kappa_function(ann1, ann2):
     """Computes Cohen kappa for pair-wise annotators.
 
@@ -23,21 +94,7 @@ def cohen_kappa_function(ann1, ann2):
     :rtype: float
     :return: Cohen kappa statistic
     """
-    count = 0
-    for an1, an2 in zip(ann1, ann2):
-        if an1 == an2:
-            count += 1
-    A = count / len(ann1)  # observed agreement A (Po)
-
-    uniq = set(ann1 + ann2)
-    E = 0  # expected agreement E (Pe)
-    for item in uniq:
-        cnt1 = ann1.count(item)
-        cnt2 = ann2.count(item)
-        count = (cnt1 / len(ann1)) * (cnt2 / len(ann2))
-        E += count
-
-    return round((A - E) / (1 - E), 4)
+    return round(cohen_kappa_matrix({"ann1": ann1, "ann2": ann2}).iloc[0, 1], 4)
 
 
 def fleiss_kappa_function(M):
@@ -73,6 +130,7 @@ def main():
 
     cohen_function = cohen_kappa_function(pairwise["ann2"], pairwise["ann6"])
     cohen_sklearn = cohen_kappa_score(pairwise["ann2"], pairwise["ann6"])
+    cohen_matrix = cohen_kappa_matrix(pairwise)
 
     with open("group1.json", "r") as fleiss_f:
         group1 = json.load(fleiss_f)
@@ -86,6 +144,7 @@ def main():
     print("\n--Our functions--")
     print("Cohen Kappa score for ann2 and ann6: {0}.".format(cohen_function))
     print("Fleiss Kappa score for group 1: {0}.".format(fleiss_function))
+    print("Cohen Kappa scores for all pairs of annotators:\n{0}".format(cohen_matrix.round(4)))
 
     print("\n--Imported functions--")
     print("Cohen Kappa score for ann2 and ann6: {0}.".format(cohen_sklearn))
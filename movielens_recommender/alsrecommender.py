@@ -5,12 +5,17 @@
 # Date: 07-08-2019
 # Updated: 31-03-2022
 
+import os
+import warnings
+from contextlib import contextmanager
+
 import pandas as pd
 import numpy as np
 from scipy.sparse import csr_matrix, save_npz, load_npz, vstack, hstack, lil_matrix
 import implicit
 import pickle
 from implicit.evaluation import train_test_split, precision_at_k, mean_average_precision_at_k
+from threadpoolctl import threadpool_info, threadpool_limits
 
 
 def load_data(movielens_file_path='files/ml-1m/ratings.dat'):
@@ -29,11 +34,12 @@ def load_data(movielens_file_path='files/ml-1m/ratings.dat'):
     return ratings
 
 
-def sparse_matrices(df):
+def sparse_matrices(df, output_dir='files'):
     """Creates the sparse user-item and item-user matrices.
 
     Args:
         df (pd.DataFrame): Table with MovieLens 1m dataset, users * movies = ratings
+        output_dir (str): directory to save the sparse matrices in
 
     Returns:
 
@@ -49,33 +55,87 @@ def sparse_matrices(df):
     # transposing the item-user matrix to create a user-item matrix
     sparse_item_user = sparse_user_item.T.tocsr()
     # save the matrices for recalculating user on the fly
-    save_npz('files/sparse_user_item.npz', sparse_user_item)
-    save_npz('files/sparse_item_user.npz', sparse_item_user)
+    save_npz(os.path.join(output_dir, 'sparse_user_item.npz'), sparse_user_item)
+    save_npz(os.path.join(output_dir, 'sparse_item_user.npz'), sparse_item_user)
 
     return sparse_user_item, sparse_item_user
 
 
-def production_model(sparse_user_item_file_path='files/sparse_user_item.npz'):
+def check_blas_threads(num_threads):
+    """Warns when numpy's BLAS threads would nest inside implicit's ALS threads.
+
+    Both thread pools default to one thread per core, so running them nested (or running several jobs on one host)
+    oversubscribes the cores and makes training and scoring many times slower.
+
+    Args:
+        num_threads (int): number of ALS threads, 0 uses all cores
+
+    Returns:
+        blas_threads (int): the largest number of threads a loaded BLAS library is allowed to use
+    """
+    blas_threads = max((pool['num_threads'] for pool in threadpool_info() if pool['user_api'] == 'blas'), default=1)
+    if num_threads != 1 and blas_threads > 1:
+        warnings.warn(f'BLAS is using {blas_threads} threads inside {num_threads or os.cpu_count()} ALS threads, '
+                      f'which oversubscribes the cores. Limit BLAS with `thread_budget` or OPENBLAS_NUM_THREADS=1.',
+                      RuntimeWarning)
+
+    return blas_threads
+
+
+@contextmanager
+def thread_budget(num_threads=0, blas_threads=1):
+    """Limits the BLAS thread pool while ALS trains or scores with `num_threads` threads.
+
+    Args:
+        num_threads (int): number of ALS threads, 0 uses all cores
+        blas_threads (int): number of BLAS threads, None leaves the BLAS thread pool untouched
+    """
+    with threadpool_limits(limits=blas_threads, user_api='blas'):
+        check_blas_threads(num_threads)
+        yield
+
+
+def load_model(model_file_path='files/model.sav', num_threads=0):
+    """Loads a pickled ALS model and sets the number of threads it scores with.
+
+    Args:
+        model_file_path (str): file path for the ALS model
+        num_threads (int): number of threads for scoring, 0 uses all cores
+
+    Returns:
+        model (implicit.als.AlternatingLeastSquares): the ALS model
+    """
+    with open(model_file_path, 'rb') as pickle_in:
+        model = pickle.load(pickle_in)
+    model.num_threads = num_threads
+
+    return model
+
+
+def production_model(sparse_user_item_file_path='files/sparse_user_item.npz', num_threads=0):
     """Fits model and saves it.
 
     Args:
         sparse_user_item_file_path (str): file location for a scipy.sparse.csr_matrix sparse user * item matrix
+        num_threads (int): number of threads for training, 0 uses all cores
     """
     sparse_user_item = load_npz(sparse_user_item_file_path)
 
-    model = implicit.als.AlternatingLeastSquares(factors=100,
-                                                 regularization=0.1, iterations=100, calculate_training_loss=False)
-    model.fit(sparse_user_item)
+    model = implicit.als.AlternatingLeastSquares(factors=100, regularization=0.1, iterations=100,
+                                                 calculate_training_loss=False, num_threads=num_threads)
+    with thread_budget(num_threads):
+        model.fit(sparse_user_item)
 
     with open('files/production_model.sav', 'wb') as pickle_out:
         pickle.dump(model, pickle_out)
 
 
-def model(sparse_user_item_file_path='files/sparse_user_item.npz'):
+def model(sparse_user_item_file_path='files/sparse_user_item.npz', num_threads=0):
     """Computes p@k and map@k evaluation mettrics and saves model.
 
     Args:
         sparse_user_item_file_path (str): file location for a scipy.sparse.csr_matrix sparse user * item matrix
+        num_threads (int): number of threads for training and evaluation, 0 uses all cores
 
     Returns:
         p_at_k (float): precision @ k recommendations, with k=10
@@ -85,41 +145,44 @@ def model(sparse_user_item_file_path='files/sparse_user_item.npz'):
 
     train, test = train_test_split(sparse_user_item, train_percentage=0.8)
 
-    model = implicit.als.AlternatingLeastSquares(factors=100,
-                                                 regularization=0.1, iterations=100, calculate_training_loss=False)
-    model.fit(train)
+    model = implicit.als.AlternatingLeastSquares(factors=100, regularization=0.1, iterations=100,
+                                                 calculate_training_loss=False, num_threads=num_threads)
+    with thread_budget(num_threads):
+        model.fit(train)
 
     with open('files/model.sav', 'wb') as pickle_out:
         pickle.dump(model, pickle_out)
 
-    p_at_k = precision_at_k(model, train_user_items=train,
-                            test_user_items=test, K=10)
-    map_at_k = mean_average_precision_at_k(model, train, test, K=10)
+    with thread_budget(num_threads):
+        p_at_k = precision_at_k(model, train_user_items=train,
+                                test_user_items=test, K=10, num_threads=num_threads)
+        map_at_k = mean_average_precision_at_k(model, train, test, K=10, num_threads=num_threads)
 
     return p_at_k, map_at_k
 
 
-def most_similar_items(item_id, model_file_path='files/model.sav', n_similar=10):
+def most_similar_items(item_id, model_file_path='files/model.sav', n_similar=10, num_threads=0):
     """Computes the most similar items.
 
     Args:
         item_id (int): identifier for movie item
         model_file_path (str): file path for the ALS model
         n_similar (int): number of similar neighbours to return
+        num_threads (int): number of threads for scoring, 0 uses all cores
 
     Returns:
         map_movies(similar) ([dic()]): similar movies with ID, title, genre and year
     """
-    with open(model_file_path, 'rb') as pickle_in:
-        model = pickle.load(pickle_in)
+    model = load_model(model_file_path, num_threads)
 
-    similar, _ = model.similar_items(item_id, n_similar)
+    with thread_budget(num_threads):
+        similar, _ = model.similar_items(item_id, n_similar)
     similar = similar[1:] # the first most similar movie == item_id
 
     return map_movies(similar)
 
 
-def most_similar_users(user_id, sparse_user_item_file_path='files/sparse_user_item.npz', model_file_path='files/model.sav', n_similar=10):
+def most_similar_users(user_id, sparse_user_item_file_path='files/sparse_user_item.npz', model_file_path='files/model.sav', n_similar=10, num_threads=0):
     """computes the most similar users.
 
     Args:
@@ -127,6 +190,7 @@ def most_similar_users(user_id, sparse_user_item_file_path='files/sparse_user_it
         sparse_user_item_file_path (str): file location for a scipy.sparse.csr_matrix sparse user * item matrix
         model_file_path (str): file path for the ALS model
         n_similar (int): number of similar neighbours to return
+        num_threads (int): number of threads for scoring, 0 uses all cores
 
     Returns:
         similar_users_info [dict()]: user information for each similar user to user_id with ID, gender, agerange, occupation
@@ -134,12 +198,12 @@ def most_similar_users(user_id, sparse_user_item_file_path='files/sparse_user_it
     """
     sparse_user_item = load_npz(sparse_user_item_file_path)
 
-    with open(model_file_path, 'rb') as pickle_in:
-        model = pickle.load(pickle_in)
+    model = load_model(model_file_path, num_threads)
 
     # similar users gives back [(users, scores)]
     # we want just the users and not the first one, because that is the same as the original user
-    similar, _ = model.similar_users(user_id, n_similar)
+    with thread_budget(num_threads):
+        similar, _ = model.similar_users(user_id, n_similar)
     similar = similar[1:] # the first most similar user == user_id
 
     # orginal users items
@@ -157,13 +221,14 @@ def most_similar_users(user_id, sparse_user_item_file_path='files/sparse_user_it
     return similar_users_info
 
 
-def recommend(user_id, model_file_path='files/model.sav', sparse_user_item_file_path='files/sparse_user_item.npz'):
+def recommend(user_id, model_file_path='files/model.sav', sparse_user_item_file_path='files/sparse_user_item.npz', num_threads=0):
     """recommend N items to user.
 
     Args:
         user_id (int): user identifier to recommend items for
         model_file_path (str): file path for the ALS model
         sparse_user_item_file_path (str): file location for a scipy.sparse.csr_matrix sparse user * item matrix
+        num_threads (int): number of threads for scoring, 0 uses all cores
 
     Returns:
         recommended ([int]): the recommended movie IDs
@@ -171,33 +236,34 @@ def recommend(user_id, model_file_path='files/model.sav', sparse_user_item_file_
     """
     sparse_user_item = load_npz(sparse_user_item_file_path)
 
-    with open(model_file_path, 'rb') as pickle_in:
-        model = pickle.load(pickle_in)
+    model = load_model(model_file_path, num_threads)
 
-    recommended, _ = model.recommend(user_id, sparse_user_item[user_id])
+    with thread_budget(num_threads):
+        recommended, _ = model.recommend(user_id, sparse_user_item[user_id])
 
     return recommended, map_movies(recommended)
 
 
-def recommend_all_users(model_file_path='files/model.sav', sparse_user_item_file_path='files/sparse_user_item.npz'):
+def recommend_all_users(model_file_path='files/model.sav', sparse_user_item_file_path='files/sparse_user_item.npz', num_threads=0):
     """Recommend N items to all users.
 
     Args:
         model_file_path (str): file path for the ALS model
         sparse_user_item_file_path (str): file location for a scipy.sparse.csr_matrix sparse user * item matrix
+        num_threads (int): number of threads for scoring, 0 uses all cores
 
     Returns:
         df (pd.DataFrame): matrix with user_id * N recommendations
     """
     sparse_user_item = load_npz(sparse_user_item_file_path)
 
-    with open(model_file_path, 'rb') as pickle_in:
-        model = pickle.load(pickle_in)
+    model = load_model(model_file_path, num_threads)
 
     # numpy array with N recommendations for each user
     # remove first array, because those are the columns
-    all_recommended = model.recommend_all(user_items=sparse_user_item, N=10,
-                                          recalculate_user=False, filter_already_liked_items=True)[1:]
+    with thread_budget(num_threads):
+        all_recommended = model.recommend_all(user_items=sparse_user_item, N=10,
+                                              recalculate_user=False, filter_already_liked_items=True)[1:]
 
     # create a new Pandas Dataframe with user_id, 10 recommendations, for all users
     df = pd.read_csv('files/ml-1m/users.dat', delimiter='::', header=None,
@@ -258,13 +324,24 @@ def map_users(user_ids, movielens_file_path='files/ml-1m/users.dat'):
     return mapped_users
 
 
-def visualize_movies():
-    """Adds poster image links and imdb url to movies data based on Movielens 100k dataset."""
+def movie_visuals(visuals_file_path='files/movie_visuals.pkl', movielens_file_path='files/ml-1m/movies.dat'):
+    """Joins poster image links and imdb urls onto the movies data once and caches the result.
+
+    Args:
+        visuals_file_path (str): file location for the cached join
+        movielens_file_path (str): file location for the MovieLens 1m movies
+
+    Returns:
+        df (pd.DataFrame): movies with ID, title, genre, url, poster and year
+    """
+    if os.path.exists(visuals_file_path):
+        return pd.read_pickle(visuals_file_path)
+
     urls = pd.read_csv('posters/movie_url.csv', delimiter=',',
                        header=None, names=['movie_id', 'url'], engine='python')
     posters = pd.read_csv('posters/movie_poster.csv', delimiter=',',
                           header=None, names=['movie_id', 'poster'], engine='python')
-    movies = pd.read_csv('files/ml-1m/movies.dat', delimiter='::', header=None, encoding='iso-8859-1',
+    movies = pd.read_csv(movielens_file_path, delimiter='::', header=None, encoding='iso-8859-1',
                          names=['movie_id', 'title', 'genre'], engine='python')
 
     visuals = pd.merge(urls, posters, on='movie_id', how='left')
@@ -273,14 +350,78 @@ def visualize_movies():
     df = pd.merge(movies, visuals, on='movie_id', how='left')
     df['year'] = df['title'].str[-5:-1]
     df['title'] = df['title'].str[:-6]
+    df.to_pickle(visuals_file_path)
 
-    # import ratings document
-    ratings = pd.read_csv('files/ml-1m/ratings.dat', delimiter='::', header=None,
-                          names=['user_id', 'movie_id', 'rating', 'timestamp'],
-                          usecols=['user_id', 'movie_id', 'rating'], engine='python')
-    # add rating count to movies dataframe
-    counts = pd.DataFrame(ratings['movie_id'].value_counts())
-    counts.columns = ['counts']
+    return df
+
+
+def update_movie_aggregates(ratings_file_path='files/ml-1m/ratings.dat',
+                            aggregates_file_path='files/movie_aggregates.npz', chunk_size=2 ** 26):
+    """Updates the per-movie rating count, rating sum and last-rated timestamp with newly appended ratings.
+
+    The aggregates are arrays indexed by movie_id that are saved together with the byte offset up to which the
+    ratings file has been read, so a refresh only parses the lines that were appended since the previous one.
+
+    Args:
+        ratings_file_path (str): file location for the MovieLens ratings
+        aggregates_file_path (str): file location for the persisted aggregates
+        chunk_size (int): number of bytes to parse at once
+
+    Returns:
+        aggregates (dict): `counts`, `rating_sums` and `last_rated` arrays indexed by movie_id
+    """
+    offset = 0
+    aggregates = {name: np.zeros(0, dtype=np.int64) for name in ['counts', 'rating_sums', 'last_rated']}
+    if os.path.exists(aggregates_file_path):
+        with np.load(aggregates_file_path) as stored:
+            # a ratings file smaller than the stored offset has been replaced rather than appended to: start over
+            if int(stored['offset']) <= os.path.getsize(ratings_file_path):
+                offset = int(stored['offset'])
+                aggregates = {name: stored[name] for name in aggregates}
+
+    with open(ratings_file_path, 'rb') as f:
+        f.seek(offset)
+        remainder = b''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            # only parse complete lines, a partially written last line is picked up on the next refresh
+            chunk, _, remainder = (remainder + chunk).rpartition(b'\n')
+            if not chunk:
+                continue
+            offset += len(chunk) + 1
+
+            # user_id::movie_id::rating::timestamp
+            ratings = np.array(chunk.replace(b'::', b' ').split(), dtype=np.int64).reshape(-1, 4)
+            movie_ids, stars, timestamps = ratings[:, 1], ratings[:, 2], ratings[:, 3]
+
+            size = max(len(aggregates['counts']), movie_ids.max() + 1)
+            aggregates = {name: np.pad(array, (0, size - len(array))) for name, array in aggregates.items()}
+            aggregates['counts'] += np.bincount(movie_ids, minlength=size)
+            aggregates['rating_sums'] += np.bincount(movie_ids, weights=stars, minlength=size).astype(np.int64)
+            np.maximum.at(aggregates['last_rated'], movie_ids, timestamps)
+
+    # write to a temporary file first so an interrupted refresh never leaves a corrupt aggregates file
+    temporary_file_path = aggregates_file_path + '.tmp.npz'
+    np.savez(temporary_file_path, offset=offset, **aggregates)
+    os.replace(temporary_file_path, aggregates_file_path)
+
+    return aggregates
+
+
+def visualize_movies():
+    """Adds poster image links, imdb url and rating aggregates to movies data based on Movielens 100k dataset."""
+    df = movie_visuals()
+
+    # add rating count, mean rating and last rated timestamp to movies dataframe
+    aggregates = update_movie_aggregates()
+    rated = np.flatnonzero(aggregates['counts'])
+    counts = pd.DataFrame({
+        'counts': aggregates['counts'][rated],
+        'mean_rating': aggregates['rating_sums'][rated] / aggregates['counts'][rated],
+        'last_rated': aggregates['last_rated'][rated],
+    }, index=rated)
 
     merged = pd.merge(df, counts, left_on='movie_id', right_index=True)
     merged.to_pickle('movies.pkl')
@@ -288,13 +429,14 @@ def visualize_movies():
     return df
 
 
-def recalculate_user(user_ratings, model_file_path='files/model.sav', sparse_user_item_file_path='files/sparse_user_item.npz'):
+def recalculate_user(user_ratings, model_file_path='files/model.sav', sparse_user_item_file_path='files/sparse_user_item.npz', num_threads=0):
     """Adds new user and its liked items to sparse matrix and returns recalculated recommendations.
 
     Args:
         user_ratings ([int]): movie ratings for new user
         model_file_path (str): file path for the ALS model
         sparse_user_item_file_path (str): file location for a scipy.sparse.csr_matrix sparse user * item matrix
+        num_threads (int): number of threads for scoring, 0 uses all cores
 
     Returns:
         recommended ([int]): the recommended movie IDs
@@ -311,10 +453,10 @@ def recalculate_user(user_ratings, model_file_path='files/model.sav', sparse_use
     m.indptr = np.hstack((m.indptr, len(m.data)))
     m._shape = (n_users + 1, n_movies)
 
-    with open(model_file_path, 'rb') as pickle_in:
-        model = pickle.load(pickle_in)
+    model = load_model(model_file_path, num_threads)
 
-    recommended, _ = model.recommend(n_users, m[n_users], recalculate_user=True)
+    with thread_budget(num_threads):
+        recommended, _ = model.recommend(n_users, m[n_users], recalculate_user=True)
 
     return recommended, map_movies(recommended)
 
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# File name: benchmark.py
+# Description: Benchmarks ingestion, training and scoring of the ALS recommender on (synthetic) MovieLens data
+# Author: Louis de Bruijn
+# Date: 19-10-2026
+
+import argparse
+import json
+import os
+import platform
+import resource
+import time
+
+import implicit
+import numpy as np
+from scipy.sparse import load_npz
+
+from alsrecommender import load_data, sparse_matrices, thread_budget
+from synthetic import generate
+
+
+def max_rss_mb():
+    """Peak resident memory of this process in MB (Linux reports kB, macOS reports bytes)."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    scale = 1024 ** 2 if platform.system() == 'Darwin' else 1024
+
+    return round(max_rss / scale, 1)
+
+
+def timed(function, *args, **kwargs):
+    """Calls `function` and returns its result with the wall time in seconds."""
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+
+    return result, time.perf_counter() - start
+
+
+def latencies(function, ids):
+    """Calls `function` once per id and summarises the latencies.
+
+    Args:
+        function (callable): function that takes a single user or item id
+        ids (np.ndarray): ids to call the function with
+
+    Returns:
+        stats (dict): p50/p99 latency in ms and throughput in calls/sec
+    """
+    timings = np.empty(len(ids))
+    for i, idx in enumerate(ids):
+        start = time.perf_counter()
+        function(idx)
+        timings[i] = time.perf_counter() - start
+
+    return {
+        'calls': len(ids),
+        'seconds': round(timings.sum(), 4),
+        'p50_ms': round(np.percentile(timings, 50) * 1000, 3),
+        'p99_ms': round(np.percentile(timings, 99) * 1000, 3),
+        'throughput': round(len(ids) / timings.sum(), 1),
+    }
+
+
+def run(data_dir, factors=100, iterations=15, n_queries=1000, batch_size=1000, seed=0, num_threads=0):
+    """Times every stage of the recommender and returns a JSON-serialisable baseline.
+
+    Args:
+        data_dir (str): directory with `ratings.dat`, the sparse matrices are written here too
+        factors (int): number of latent factors of the ALS model
+        iterations (int): number of ALS iterations
+        n_queries (int): number of users and items to sample for the latency stages
+        batch_size (int): number of users to recommend for at once in the batch stage
+        seed (int): seed for sampling query ids
+        num_threads (int): number of ALS threads, 0 uses all cores
+
+    Returns:
+        results (dict): benchmark configuration, environment and per-stage statistics
+    """
+    rng = np.random.default_rng(seed)
+    stages = {}
+
+    df, seconds = timed(load_data, os.path.join(data_dir, 'ratings.dat'))
+    stages['ingestion'] = {'seconds': round(seconds, 4), 'throughput': round(len(df) / seconds, 1),
+                           'max_rss_mb': max_rss_mb()}
+
+    (user_items, _), seconds = timed(sparse_matrices, df, output_dir=data_dir)
+    stages['matrix_building'] = {'seconds': round(seconds, 4), 'throughput': round(len(df) / seconds, 1),
+                                 'max_rss_mb': max_rss_mb()}
+    n_interactions = len(df)
+    del df
+
+    model = implicit.als.AlternatingLeastSquares(factors=factors, regularization=0.1, iterations=iterations,
+                                                 calculate_training_loss=False, random_state=seed,
+                                                 num_threads=num_threads)
+    with thread_budget(num_threads):
+        _, seconds = timed(model.fit, user_items, show_progress=False)
+    stages['training'] = {'seconds': round(seconds, 4), 'throughput': round(user_items.nnz * iterations / seconds, 1),
+                          'max_rss_mb': max_rss_mb()}
+
+    # only users and items that have interactions are meaningful queries
+    users = rng.choice(np.flatnonzero(np.diff(user_items.indptr)), size=n_queries)
+    items = rng.choice(np.unique(user_items.indices), size=n_queries)
+
+    with thread_budget(num_threads):
+        stages['recommend'] = latencies(lambda u: model.recommend(u, user_items[u], N=10), users)
+        stages['recommend']['max_rss_mb'] = max_rss_mb()
+
+        batches = [users[i:i + batch_size] for i in range(0, len(users), batch_size)]
+        stages['batch_recommend'] = latencies(lambda b: model.recommend(b, user_items[b], N=10), batches)
+        stages['batch_recommend']['users_per_sec'] = round(len(users) / stages['batch_recommend']['seconds'], 1)
+        stages['batch_recommend']['max_rss_mb'] = max_rss_mb()
+
+        stages['similar_items'] = latencies(lambda i: model.similar_items(i, N=10), items)
+        stages['similar_items']['max_rss_mb'] = max_rss_mb()
+
+        stages['fold_in'] = latencies(lambda u: model.recommend(u, user_items[u], N=10, recalculate_user=True), users)
+        stages['fold_in']['max_rss_mb'] = max_rss_mb()
+
+    return {
+        'config': {'data_dir': data_dir, 'interactions': n_interactions, 'users': user_items.shape[0],
+                   'items': user_items.shape[1], 'factors': factors, 'iterations': iterations,
+                   'n_queries': n_queries, 'batch_size': batch_size, 'seed': seed, 'num_threads': num_threads},
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                        'implicit': implicit.__version__, 'cpu_count': os.cpu_count(), 'machine': platform.machine()},
+        'stages': stages,
+    }
+
+
+def thread_scaling(data_dir, thread_counts, factors=100, iterations=15, n_queries=1000, seed=0):
+    """Times training and batch recommendation for every thread budget, to pick the budget per host.
+
+    Args:
+        data_dir (str): directory with the `sparse_user_item.npz` written by `run`
+        thread_counts ([int]): numbers of ALS threads to try, e.g. [1, 2, 4, 8]
+        factors (int): number of latent factors of the ALS model
+        iterations (int): number of ALS iterations
+        n_queries (int): number of users to recommend for in one batch
+        seed (int): seed for the model and for sampling users
+
+    Returns:
+        scaling ([dict]): training time, batch throughput and speedup over the first budget per thread count
+    """
+    user_items = load_npz(os.path.join(data_dir, 'sparse_user_item.npz'))
+    users = np.random.default_rng(seed).choice(np.flatnonzero(np.diff(user_items.indptr)), size=n_queries)
+
+    scaling = []
+    for num_threads in thread_counts:
+        model = implicit.als.AlternatingLeastSquares(factors=factors, regularization=0.1, iterations=iterations,
+                                                     calculate_training_loss=False, random_state=seed,
+                                                     num_threads=num_threads)
+        with thread_budget(num_threads):
+            _, training_seconds = timed(model.fit, user_items, show_progress=False)
+            _, recommend_seconds = timed(model.recommend, users, user_items[users], N=10)
+
+        scaling.append({'num_threads': num_threads, 'training_seconds': round(training_seconds, 4),
+                        'batch_users_per_sec': round(n_queries / recommend_seconds, 1),
+                        'training_speedup': round(scaling[0]['training_seconds'] / training_seconds, 2)
+                        if scaling else 1.0})
+
+    return scaling
+
+
+def parse_arguments():
+    """Read arguments from a command line."""
+    parser = argparse.ArgumentParser(description='Benchmark the ALS recommender')
+    parser.add_argument('--data', metavar='DIR', default='files/synthetic',
+                        help='directory with MovieLens-formatted files, generated when missing')
+    parser.add_argument('--interactions', type=int, default=1000000,
+                        help='number of synthetic ratings to generate when --data has no ratings.dat')
+    parser.add_argument('--factors', type=int, default=100, help='number of latent factors')
+    parser.add_argument('--iterations', type=int, default=15, help='number of ALS iterations')
+    parser.add_argument('--queries', type=int, default=1000, help='number of sampled users/items per latency stage')
+    parser.add_argument('--batch-size', type=int, default=1000, help='number of users per batch recommendation')
+    parser.add_argument('--num-threads', type=int, default=0, help='number of ALS threads, 0 uses all cores')
+    parser.add_argument('--threads', type=int, nargs='+', default=None,
+                        help='also benchmark scaling over these thread budgets, e.g. --threads 1 2 4 8')
+    parser.add_argument('--output', metavar='FILE', default='benchmark.json', help='JSON file for the baseline')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+
+    if not os.path.exists(os.path.join(args.data, 'ratings.dat')):
+        generate(args.data, n_interactions=args.interactions)
+
+    results = run(args.data, args.factors, args.iterations, args.queries, args.batch_size,
+                  num_threads=args.num_threads)
+    if args.threads:
+        results['thread_scaling'] = thread_scaling(args.data, args.threads, args.factors, args.iterations,
+                                                   args.queries)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps({key: value for key, value in results.items() if key in ['stages', 'thread_scaling']}, indent=2))
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# File name: sqlite_export.py
+# Description: Exports recommendations and movie metadata to indexed SQLite tables for the Django front end
+# Author: Louis de Bruijn
+# Date: 19-10-2026
+
+import sqlite3
+import time
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+RECOMMENDATION_COLUMNS = ['rec1', 'rec2', 'rec3', 'rec4', 'rec5', 'rec6', 'rec7', 'rec8', 'rec9', 'rec10']
+MOVIE_COLUMNS = ['movie_id', 'title', 'genre', 'year', 'url', 'poster', 'counts']
+
+
+def connect(db_file_path='files/movielens.sqlite3'):
+    """Opens a connection that is tuned for bulk loading.
+
+    Args:
+        db_file_path (str): file location for the SQLite database
+
+    Returns:
+        connection (sqlite3.Connection): connection to the SQLite database
+    """
+    connection = sqlite3.connect(db_file_path)
+    # the tables are rebuilt from the model output, so durability during the load is not needed
+    connection.execute('PRAGMA journal_mode = MEMORY')
+    connection.execute('PRAGMA synchronous = OFF')
+
+    return connection
+
+
+def _bulk_insert(connection, table, columns, rows, batch_size):
+    """Inserts rows in batched transactions and returns the number of rows written."""
+    statement = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})'
+
+    n_rows = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        with connection:  # one transaction per batch
+            connection.executemany(statement, batch)
+        n_rows += len(batch)
+
+    return n_rows
+
+
+def _report(table, n_rows, seconds):
+    """Prints and returns the load throughput in rows/sec."""
+    rows_per_second = n_rows / seconds if seconds > 0 else float('inf')
+    print(f'Loaded {n_rows} rows into {table} in {seconds:.2f}s ({rows_per_second:,.0f} rows/sec)')
+
+    return rows_per_second
+
+
+def export_recommendations(df, db_file_path='files/movielens.sqlite3', batch_size=50000):
+    """Writes the recommendations of all users to an indexed `recommendations` table.
+
+    Args:
+        df (pd.DataFrame): matrix with user_id * N recommendations, as returned by `recommend_all_users`
+        db_file_path (str): file location for the SQLite database
+        batch_size (int): number of rows per transaction
+
+    Returns:
+        rows_per_second (float): load throughput
+    """
+    columns = [column for column in RECOMMENDATION_COLUMNS if column in df.columns]
+    recommendations = df[columns].to_numpy(dtype=np.int64)
+    n_users, n_recommended = recommendations.shape
+
+    # melt the wide user_id * N matrix into (user_id, rank, movie_id) rows without a pandas round-trip
+    user_ids = np.repeat(df['user_id'].to_numpy(dtype=np.int64), n_recommended)
+    ranks = np.tile(np.arange(1, n_recommended + 1), n_users)
+    rows = list(zip(user_ids.tolist(), ranks.tolist(), recommendations.ravel().tolist()))
+
+    with closing(connect(db_file_path)) as connection:
+        connection.execute('DROP TABLE IF EXISTS recommendations')
+        connection.execute('CREATE TABLE recommendations (user_id INTEGER NOT NULL, rank INTEGER NOT NULL, '
+                           'movie_id INTEGER NOT NULL)')
+
+        start = time.perf_counter()
+        n_rows = _bulk_insert(connection, 'recommendations', ['user_id', 'rank', 'movie_id'], rows, batch_size)
+        # building the index after the load is cheaper than maintaining it for every insert
+        with connection:
+            connection.execute('CREATE UNIQUE INDEX idx_recommendations_user ON recommendations (user_id, rank)')
+        seconds = time.perf_counter() - start
+
+    return _report('recommendations', n_rows, seconds)
+
+
+def export_movies(df, db_file_path='files/movielens.sqlite3', batch_size=50000):
+    """Writes movie information, posters, urls and rating counts to a `movies` table keyed on movie_id.
+
+    Args:
+        df (pd.DataFrame): movies table as pickled by `visualize_movies`
+        db_file_path (str): file location for the SQLite database
+        batch_size (int): number of rows per transaction
+
+    Returns:
+        rows_per_second (float): load throughput
+    """
+    movies = df.reindex(columns=MOVIE_COLUMNS).astype(object)
+    movies = movies.where(pd.notnull(movies), None)  # SQLite stores missing posters and urls as NULL
+    movies['movie_id'] = movies['movie_id'].astype(int)
+    rows = list(movies.itertuples(index=False, name=None))
+
+    with closing(connect(db_file_path)) as connection:
+        connection.execute('DROP TABLE IF EXISTS movies')
+        connection.execute('CREATE TABLE movies (movie_id INTEGER PRIMARY KEY, title TEXT, genre TEXT, year TEXT, '
+                           'url TEXT, poster TEXT, counts INTEGER)')
+
+        start = time.perf_counter()
+        n_rows = _bulk_insert(connection, 'movies', MOVIE_COLUMNS, rows, batch_size)
+        seconds = time.perf_counter() - start
+
+    return _report('movies', n_rows, seconds)
+
+
+def top_recommendations(user_id, db_file_path='files/movielens.sqlite3', n=10):
+    """Fetches the top-n recommended movies for a user with an index lookup.
+
+    Args:
+        user_id (int): user identifier to fetch recommendations for
+        db_file_path (str): file location for the SQLite database
+        n (int): number of recommendations to return
+
+    Returns:
+        recommended ([dic()]): recommended movies in rank order with ID, title, genre, year, url, poster and counts
+    """
+    query = ('SELECT r.rank, r.movie_id, m.title, m.genre, m.year, m.url, m.poster, m.counts '
+             'FROM recommendations AS r LEFT JOIN movies AS m ON m.movie_id = r.movie_id '
+             'WHERE r.user_id = ? AND r.rank <= ? ORDER BY r.rank')
+
+    with closing(sqlite3.connect(db_file_path)) as connection:
+        connection.row_factory = sqlite3.Row
+        recommended = [dict(row) for row in connection.execute(query, (user_id, n))]
+
+    return recommended
+
+
+if __name__ == '__main__':
+
+    export_recommendations(pd.read_pickle('all_recommended.pkl'))
+    export_movies(pd.read_pickle('movies.pkl'))
+
+    user_id = 2
+    print(f'Recommended movies for user {user_id}: {top_recommendations(user_id)}\n')
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# File name: synthetic.py
+# Description: Generates synthetic MovieLens-shaped ratings, movies and users files for benchmarking
+# Author: Louis de Bruijn
+# Date: 19-10-2026
+
+import argparse
+import os
+
+import numpy as np
+
+GENRES = ['Action', 'Adventure', 'Animation', "Children's", 'Comedy', 'Crime', 'Documentary', 'Drama', 'Fantasy',
+          'Film-Noir', 'Horror', 'Musical', 'Mystery', 'Romance', 'Sci-Fi', 'Thriller', 'War', 'Western']
+AGE_RANGES = [1, 18, 25, 35, 45, 50, 56]
+# rating distribution of the MovieLens 1m dataset for the scale (1-5)
+RATING_PROBABILITIES = [0.056, 0.108, 0.261, 0.349, 0.226]
+# first and last timestamp in the MovieLens 1m dataset
+TIMESTAMP_RANGE = (956703932, 1046454590)
+
+
+def default_sizes(n_interactions):
+    """Scales the number of users and movies with the number of interactions like the MovieLens datasets do.
+
+    Args:
+        n_interactions (int): number of ratings to generate
+
+    Returns:
+        n_users (int): number of users
+        n_movies (int): number of movies
+    """
+    # MovieLens 1m has ~165 ratings per user and 3883 movies, the catalogue grows slower than the user base
+    n_users = max(n_interactions // 165, 1)
+    n_movies = max(int(3883 * (n_interactions / 1e6) ** 0.5), 10)
+
+    return n_users, n_movies
+
+
+def power_law_probabilities(n, exponent, rng):
+    """Zipf-like probabilities over `n` ids that are shuffled so popularity does not follow the id order.
+
+    Args:
+        n (int): number of ids
+        exponent (float): power-law exponent, higher values concentrate interactions on fewer ids
+        rng (np.random.Generator): random number generator
+
+    Returns:
+        probabilities (np.ndarray): probability for each id (index 0 is id 1)
+    """
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    rng.shuffle(weights)
+
+    return weights / weights.sum()
+
+
+def write_ratings(file_path, n_interactions, n_users, n_movies, exponent=1.0, seed=0, chunk_size=1000000):
+    """Writes `user_id::movie_id::rating::timestamp` lines in chunks, so memory does not grow with the file size.
+
+    Users and movies are both drawn from a power-law: a few users rate a lot and a few movies are very popular.
+    Like MovieLens, user and movie ids start at 1. Unlike MovieLens, a user may rate the same movie twice.
+
+    Args:
+        file_path (str): file location for the ratings file
+        n_interactions (int): number of ratings to generate
+        n_users (int): number of users
+        n_movies (int): number of movies
+        exponent (float): power-law exponent for movie popularity
+        seed (int): seed for the random number generator
+        chunk_size (int): number of ratings generated and written at once
+    """
+    rng = np.random.default_rng(seed)
+    # the cumulative distributions allow sampling with a binary search instead of `rng.choice` on huge `p` arrays
+    user_cdf = np.cumsum(power_law_probabilities(n_users, 0.5, rng))
+    movie_cdf = np.cumsum(power_law_probabilities(n_movies, exponent, rng))
+
+    with open(file_path, 'w', encoding='iso-8859-1') as f:
+        for start in range(0, n_interactions, chunk_size):
+            size = min(chunk_size, n_interactions - start)
+
+            chunk = np.empty((size, 4), dtype=np.int64)
+            chunk[:, 0] = np.searchsorted(user_cdf, rng.random(size) * user_cdf[-1]) + 1
+            chunk[:, 1] = np.searchsorted(movie_cdf, rng.random(size) * movie_cdf[-1]) + 1
+            chunk[:, 2] = rng.choice(5, size=size, p=RATING_PROBABILITIES) + 1
+            chunk[:, 3] = rng.integers(*TIMESTAMP_RANGE, size=size)
+
+            np.savetxt(f, chunk, fmt='%d::%d::%d::%d')
+
+
+def write_movies(file_path, n_movies, seed=0):
+    """Writes `movie_id::title (year)::genre|genre` lines.
+
+    Args:
+        file_path (str): file location for the movies file
+        n_movies (int): number of movies
+        seed (int): seed for the random number generator
+    """
+    rng = np.random.default_rng(seed)
+    years = rng.integers(1919, 2001, size=n_movies)
+    n_genres = rng.integers(1, 4, size=n_movies)
+
+    with open(file_path, 'w', encoding='iso-8859-1') as f:
+        for movie_id, (year, n) in enumerate(zip(years, n_genres), start=1):
+            genres = '|'.join(rng.choice(GENRES, size=n, replace=False))
+            f.write(f'{movie_id}::Movie {movie_id} ({year})::{genres}\n')
+
+
+def write_users(file_path, n_users, seed=0):
+    """Writes `user_id::gender::agerange::occupation::zipcode` lines.
+
+    Args:
+        file_path (str): file location for the users file
+        n_users (int): number of users
+        seed (int): seed for the random number generator
+    """
+    rng = np.random.default_rng(seed)
+    genders = rng.choice(['F', 'M'], size=n_users, p=[0.28, 0.72])
+    ages = rng.choice(AGE_RANGES, size=n_users)
+    occupations = rng.integers(0, 21, size=n_users)
+    zipcodes = rng.integers(0, 100000, size=n_users)
+
+    with open(file_path, 'w', encoding='iso-8859-1') as f:
+        for user_id, (gender, age, occupation, zipcode) in enumerate(zip(genders, ages, occupations, zipcodes), start=1):
+            f.write(f'{user_id}::{gender}::{age}::{occupation}::{zipcode:05d}\n')
+
+
+def generate(output_dir, n_interactions=1000000, n_users=None, n_movies=None, exponent=1.0, seed=0):
+    """Generates `ratings.dat`, `movies.dat` and `users.dat` in the MovieLens `::` format.
+
+    Args:
+        output_dir (str): directory to write the files to
+        n_interactions (int): number of ratings to generate
+        n_users (int): number of users, scaled with `n_interactions` when not given
+        n_movies (int): number of movies, scaled with `n_interactions` when not given
+        exponent (float): power-law exponent for movie popularity
+        seed (int): seed for the random number generator
+
+    Returns:
+        output_dir (str): directory with the generated files
+    """
+    default_users, default_movies = default_sizes(n_interactions)
+    n_users = n_users or default_users
+    n_movies = n_movies or default_movies
+
+    os.makedirs(output_dir, exist_ok=True)
+    write_ratings(os.path.join(output_dir, 'ratings.dat'), n_interactions, n_users, n_movies, exponent, seed)
+    write_movies(os.path.join(output_dir, 'movies.dat'), n_movies, seed)
+    write_users(os.path.join(output_dir, 'users.dat'), n_users, seed)
+
+    return output_dir
+
+
+def parse_arguments():
+    """Read arguments from a command line."""
+    parser = argparse.ArgumentParser(description='Generate a synthetic MovieLens-shaped dataset')
+    parser.add_argument('--output', metavar='DIR', default='files/synthetic', help='directory to write the files to')
+    parser.add_argument('--interactions', type=int, default=1000000, help='number of ratings, e.g. 1000000-100000000')
+    parser.add_argument('--users', type=int, default=None, help='number of users')
+    parser.add_argument('--movies', type=int, default=None, help='number of movies')
+    parser.add_argument('--exponent', type=float, default=1.0, help='power-law exponent for movie popularity')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the random number generator')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    generate(args.output, args.interactions, args.users, args.movies, args.exponent, args.seed)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# File name: benchmark.py
+# Description: Micro-benchmarks for feature transformers of the NLP pipeline
+# Author: Louis de Bruijn
+# Date: 19-10-2026
+
+import argparse
+import timeit
+
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.feature_extraction import DictVectorizer
+from sklearn.pipeline import Pipeline
+
+from features import LengthFeatures
+
+
+class DictLengthFeatures(BaseEstimator, TransformerMixin):
+    """The dict-per-document LengthFeatures transformer, kept as the baseline to compare against."""
+    def fit(self, x, y=None):
+        return self
+
+    def _get_features(self, doc):
+        return {"words": len(doc), "unique_words": len(set(doc))}
+
+    def transform(self, raw_documents):
+        return [self._get_features(doc) for doc in raw_documents]
+
+
+def synthetic_documents(n_documents=100000, vocabulary_size=50000, mean_length=150, seed=0):
+    """Generate tokenized documents with a Zipf-like word distribution.
+
+    :param n_documents: number of documents
+    :type n_documents: int
+    :param vocabulary_size: number of distinct words
+    :type vocabulary_size: int
+    :param mean_length: average number of tokens per document
+    :type mean_length: int
+    :param seed: seed for the random number generator
+    :type seed: int
+
+    :rtype: (list, dict)
+    :return: tokens per document, vocabulary of token to id
+    """
+    rng = np.random.default_rng(seed)
+    words = np.array(['w{0}'.format(i) for i in range(vocabulary_size)], dtype=object)
+    lengths = rng.poisson(mean_length, size=n_documents)
+    token_ids = np.minimum(rng.zipf(1.3, size=lengths.sum()) - 1, vocabulary_size - 1)
+
+    tokens = words[token_ids].tolist()
+    offsets = np.concatenate(([0], np.cumsum(lengths))).tolist()
+    documents = [tokens[start:end] for start, end in zip(offsets, offsets[1:])]
+
+    return documents, {word: i for i, word in enumerate(words)}
+
+
+def benchmark_length_features(documents, vocabulary, repeat=3, n_jobs=None):
+    """Time the dict path against the array-native LengthFeatures and check that both give the same matrix.
+
+    :param documents: tokens per document
+    :type documents: list
+    :param vocabulary: mapping of tokens to integer ids, to encode the documents as token id arrays
+    :type vocabulary: dict
+    :param repeat: number of timed runs, the fastest is reported
+    :type repeat: int
+    :param n_jobs: number of worker processes for the array-native transformer
+    :type n_jobs: int
+
+    :rtype: dict
+    :return: best time in seconds per implementation
+    """
+    transformers = {
+        'dict': Pipeline([('textstats', DictLengthFeatures()), ('vec', DictVectorizer())]),
+        'array': LengthFeatures(n_jobs=n_jobs),
+        'array_token_ids': LengthFeatures(n_jobs=n_jobs),
+    }
+
+    # documents as token id arrays, as the corpus cache provides them
+    token_ids = [np.fromiter(map(vocabulary.__getitem__, doc), dtype=np.int32, count=len(doc)) for doc in documents]
+    inputs = {'dict': documents, 'array': documents, 'array_token_ids': token_ids}
+
+    baseline = transformers['dict'].fit_transform(documents).toarray()
+    timings = {}
+    for name, transformer in transformers.items():
+        X = inputs[name]
+        assert np.array_equal(transformer.fit_transform(X).toarray(), baseline), name
+        timings[name] = min(timeit.repeat(lambda: transformer.fit_transform(X), number=1, repeat=repeat))
+
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the LengthFeatures transformer')
+    parser.add_argument('--documents', type=int, default=100000, help='number of synthetic documents')
+    parser.add_argument('--jobs', type=int, default=None, help='number of worker processes')
+    args = parser.parse_args()
+
+    documents, vocabulary = synthetic_documents(args.documents)
+    timings = benchmark_length_features(documents, vocabulary, n_jobs=args.jobs)
+    for name, seconds in timings.items():
+        print('{0:>16}: {1:.3f}s ({2:.1f}x)'.format(name, seconds, timings['dict'] / seconds))
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# File name: corpus_cache.py
+# Description: Caches a tokenized corpus as memory-mappable integer token ids with offsets
+# Author: Louis de Bruijn
+# Date: 19-10-2026
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from array import array
+
+import numpy as np
+
+
+def file_hash(file_path, chunk_size=2 ** 20):
+    """Compute the SHA-256 hash of a file without reading it into memory at once.
+
+    :param file_path: path to the file
+    :type file_path: str
+    :param chunk_size: number of bytes to read at once
+    :type chunk_size: int
+
+    :rtype: str
+    :return: hexadecimal digest of the file contents
+    """
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+
+    return sha.hexdigest()
+
+
+def build_cache(corpus_file, directory):
+    """Tokenize a corpus once into a vocabulary, a flat token id array and document offsets.
+
+    Document i consists of the token ids ``tokens[offsets[i]:offsets[i + 1]]``, like the
+    ``indices``/``indptr`` arrays of a CSR matrix. Both label columns are stored as integer codes.
+
+    :param corpus_file: newline delimited file with a review on each line
+    :type corpus_file: str
+    :param directory: directory to write the cache to
+    :type directory: str
+    """
+    vocabulary = {}
+    labels = {'multiclass': {}, 'binary': {}}
+    tokens = array('i')
+    offsets = array('q', [0])
+    codes = {'multiclass': array('h'), 'binary': array('h')}
+
+    with open(corpus_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            words = line.strip().split()
+
+            # 6-class problem: books, camera, dvd, health, music, software
+            codes['multiclass'].append(labels['multiclass'].setdefault(words[0], len(labels['multiclass'])))
+            # 2-class problem: positive vs negative
+            codes['binary'].append(labels['binary'].setdefault(words[1], len(labels['binary'])))
+
+            tokens.extend(vocabulary.setdefault(word, len(vocabulary)) for word in words[3:])
+            offsets.append(len(tokens))
+
+    # write into a temporary directory first, so an interrupted build never leaves a partial cache behind
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    temporary = tempfile.mkdtemp(dir=parent)
+
+    np.save(os.path.join(temporary, 'tokens.npy'), np.frombuffer(tokens, dtype=np.int32))
+    np.save(os.path.join(temporary, 'offsets.npy'), np.frombuffer(offsets, dtype=np.int64))
+    for task, task_codes in codes.items():
+        np.save(os.path.join(temporary, f'labels_{task}.npy'), np.frombuffer(task_codes, dtype=np.int16))
+    with open(os.path.join(temporary, 'vocabulary.json'), 'w', encoding='utf-8') as f:
+        json.dump({'vocabulary': list(vocabulary), 'labels': {task: list(names) for task, names in labels.items()}},
+                  f, ensure_ascii=False)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(temporary, directory)
+
+
+class CorpusCache:
+    """Tokenized corpus backed by (memory-mapped) numpy arrays."""
+
+    def __init__(self, directory, mmap_mode='r'):
+        """Load a corpus cache written by :func:`build_cache`.
+
+        :param directory: directory of the cache
+        :type directory: str
+        :param mmap_mode: memory-map mode for the arrays, None reads them into memory
+        :type mmap_mode: str
+        """
+        self.directory = directory
+        self.tokens = np.load(os.path.join(directory, 'tokens.npy'), mmap_mode=mmap_mode)
+        self.offsets = np.load(os.path.join(directory, 'offsets.npy'), mmap_mode=mmap_mode)
+        self.codes = {task: np.load(os.path.join(directory, f'labels_{task}.npy'), mmap_mode=mmap_mode)
+                      for task in ['multiclass', 'binary']}
+
+        with open(os.path.join(directory, 'vocabulary.json'), 'r', encoding='utf-8') as f:
+            names = json.load(f)
+        self.vocabulary = np.array(names['vocabulary'], dtype=object)
+        self.label_names = {task: np.array(task_names, dtype=object) for task, task_names in names['labels'].items()}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def token_ids(self, index):
+        """Return the token ids of a single document as a view on the token array."""
+        return self.tokens[self.offsets[index]:self.offsets[index + 1]]
+
+    def documents(self):
+        """Decode all documents to lists of tokens.
+
+        The tokens are shared references into the vocabulary, so equal words are stored only once.
+
+        :rtype: list of lists
+        :return: tokens per document
+        """
+        words = self.vocabulary[self.tokens].tolist()
+        offsets = self.offsets.tolist()
+
+        return [words[start:end] for start, end in zip(offsets, offsets[1:])]
+
+    def labels(self, binary):
+        """Decode the labels of the binary or multiclass task.
+
+        :param binary: flag for binary classification task
+        :type binary: bool
+
+        :rtype: list
+        :return: class label per document
+        """
+        task = 'binary' if binary else 'multiclass'
+
+        return self.label_names[task][self.codes[task]].tolist()
+
+
+def load_corpus(corpus_file, cache_dir='.corpus_cache', mmap_mode='r'):
+    """Load the cache for a corpus file, tokenizing the file only if it has not been cached before.
+
+    :param corpus_file: newline delimited file with a review on each line
+    :type corpus_file: str
+    :param cache_dir: directory that holds one cache per source file hash
+    :type cache_dir: str
+    :param mmap_mode: memory-map mode for the arrays, None reads them into memory
+    :type mmap_mode: str
+
+    :rtype: CorpusCache
+    :return: the cached corpus
+    """
+    directory = os.path.join(cache_dir, file_hash(corpus_file))
+    if not os.path.isdir(directory):
+        build_cache(corpus_file, directory)
+
+    return CorpusCache(directory, mmap_mode=mmap_mode)
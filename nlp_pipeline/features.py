@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# File name: features.py
+# Description: Feature transformers of the NLP pipeline, defined at module level so fitted pipelines can be pickled
+# Author: Louis de Bruijn
+# Date: 19-10-2026
+
+import sys
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from scipy.sparse import csr_matrix
+from sklearn.base import BaseEstimator, TransformerMixin, clone
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, CountVectorizer, TfidfVectorizer
+
+
+def identity(x):
+    """Return the input unchanged, to pass pre-tokenized documents through a vectorizer.
+
+    Unlike ``lambda x: x``, a module-level function can be pickled with a fitted vectorizer.
+    """
+    return x
+
+
+def unique_counts(token_ids, offsets):
+    """Count the unique token ids per document without building a set per document.
+
+    :param token_ids: token ids of all documents, concatenated
+    :type token_ids: numpy.ndarray
+    :param offsets: start of each document in token_ids, followed by len(token_ids)
+    :type offsets: numpy.ndarray
+
+    :rtype: numpy.ndarray
+    :return: number of unique token ids per document
+    """
+    n_documents = len(offsets) - 1
+    if len(token_ids) == 0:
+        return np.zeros(n_documents, dtype=np.int64)
+
+    # one sort over (document, token id) keys puts duplicates next to each other
+    base = int(token_ids.max()) + 1
+    documents = np.repeat(np.arange(n_documents, dtype=np.int64), np.diff(offsets))
+    keys = np.sort(documents * base + token_ids)
+    first = np.empty(len(keys), dtype=bool)
+    first[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=first[1:])
+
+    return np.bincount(keys[first] // base, minlength=n_documents)
+
+
+class StopWordFilter:
+    """Remove stop words from pre-tokenized documents, as the tokenizer or bigram analyzer of a vectorizer.
+
+    The vectorizers' own `stop_words` would split every stop word into characters with the identity tokenizer,
+    and would form bigrams across the removed words that never occur in the text.
+    """
+    def __init__(self, stop_words):
+        """
+        :param stop_words: tokens to remove, or 'english'
+        :type stop_words: list or str
+        """
+        self.stop_words = frozenset(ENGLISH_STOP_WORDS if stop_words == 'english' else stop_words)
+
+    def __call__(self, tokens):
+        return [token for token in tokens if token not in self.stop_words]
+
+    def bigrams(self, tokens):
+        """Return the adjacent token pairs of a document without a stop word, joined as CountVectorizer does."""
+        return [first + ' ' + second for first, second in zip(tokens, tokens[1:])
+                if first not in self.stop_words and second not in self.stop_words]
+
+
+class LengthFeatures(BaseEstimator, TransformerMixin):
+    """Feature engineer the length of each feature."""
+    def __init__(self, n_jobs=None, chunk_size=10000, dtype=np.float32):
+        """Emit the number of unique words and words per document as a float32 sparse matrix.
+
+        Documents are lists of tokens, or arrays of token ids from the corpus cache.
+
+        :param n_jobs: number of worker processes to transform chunks of documents with
+        :type n_jobs: int
+        :param chunk_size: number of documents per chunk
+        :type chunk_size: int
+        :param dtype: type of the output matrix
+        :type dtype: type
+        """
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+        self.dtype = dtype
+
+    def fit(self, x, y=None):
+        return self
+
+    def get_feature_names_out(self, input_features=None):
+        # same column order as the DictVectorizer this transformer replaces
+        return np.array(['unique_words', 'words'], dtype=object)
+
+    def _get_features(self, documents):
+        words = np.fromiter((len(doc) for doc in documents), dtype=np.int64, count=len(documents))
+
+        if len(documents) and isinstance(documents[0], np.ndarray):
+            # documents that are already encoded as token ids by the corpus cache are counted without hashing
+            unique_words = unique_counts(np.concatenate(documents), np.concatenate(([0], np.cumsum(words))))
+        else:
+            unique_words = np.fromiter((len(set(doc)) for doc in documents), dtype=np.int64, count=len(documents))
+
+        return np.column_stack((unique_words, words)).astype(self.dtype)
+
+    def transform(self, raw_documents):
+        if self.n_jobs in (None, 1) or len(raw_documents) <= self.chunk_size:
+            features = self._get_features(raw_documents)
+        else:
+            chunks = [raw_documents[i:i + self.chunk_size] for i in range(0, len(raw_documents), self.chunk_size)]
+            features = np.vstack(Parallel(n_jobs=self.n_jobs)(delayed(self._get_features)(chunk) for chunk in chunks))
+
+        return csr_matrix(features)
+
+
+def base_transformers(min_df=1, max_df=1.0, max_features=None, stop_words=None, dtype=np.float64):
+    """Create the unfitted transformer of each feature.
+
+    The vocabulary options bound the memory of the bigram and tf-idf vocabularies on large corpora.
+
+    :param min_df: ignore terms in fewer documents than this count (int) or fraction (float)
+    :type min_df: int or float
+    :param max_df: ignore terms in more documents than this count (int) or fraction (float)
+    :type max_df: int or float
+    :param max_features: keep only this many most frequent terms per vectorizer
+    :type max_features: int
+    :param stop_words: tokens to remove, and to drop the bigrams of, or 'english'
+    :type stop_words: list or str
+    :param dtype: type of the output matrices, np.float32 halves their memory
+    :type dtype: type
+
+    :rtype: dict
+    :return: transformer per feature name, in the order they are combined
+    """
+    vocabulary = {'min_df': min_df, 'max_df': max_df, 'max_features': max_features, 'dtype': dtype}
+
+    if stop_words:
+        stop_word_filter = StopWordFilter(stop_words)
+        count = CountVectorizer(analyzer=stop_word_filter.bigrams, **vocabulary)
+        tokenizer = stop_word_filter
+    else:
+        count = CountVectorizer(preprocessor=identity, tokenizer=identity, token_pattern=None, ngram_range=(2, 2),
+                                **vocabulary)
+        tokenizer = identity
+
+    return {
+        'count': count,
+        'tfidf': TfidfVectorizer(preprocessor=identity, tokenizer=tokenizer, token_pattern=None, **vocabulary),
+        'textstats': LengthFeatures(dtype=dtype),
+    }
+
+
+def memory_report(union, documents, sample_size=10000, random_state=0):
+    """Estimate the vocabulary size and matrix memory of every block of a FeatureUnion on all documents.
+
+    Clones of the transformers are fitted on a random sample only, so the report can size an experiment before
+    the real fit runs out of memory. The non-zeros grow linearly with the number of documents, the vocabulary
+    as ``n_documents ** beta`` (Heaps' law), with beta estimated from the vocabularies of half and all the sample.
+    Corpora up to `sample_size` documents are measured exactly.
+
+    :param union: fitted or unfitted union of feature transformers
+    :type union: sklearn.pipeline.FeatureUnion
+    :param documents: tokenized documents
+    :type documents: list
+    :param sample_size: number of documents to fit and transform
+    :type sample_size: int
+    :param random_state: seed of the sample
+    :type random_state: int
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: vocabulary size, approximate vocabulary bytes, non-zeros and matrix bytes per feature block
+    """
+    n_documents = len(documents)
+    if n_documents > sample_size:
+        indices = np.random.default_rng(random_state).choice(n_documents, size=sample_size, replace=False)
+        sample = [documents[i] for i in indices.tolist()]
+    else:
+        sample = list(documents)
+    scale = n_documents / len(sample)
+
+    rows = []
+    for name, transformer in union.transformer_list:
+        fitted = clone(transformer)
+        X = fitted.fit_transform(sample).tocsr()
+        vocabulary = getattr(fitted, 'vocabulary_', {})
+        # the dict plus its string keys; the int values are small and mostly shared
+        vocabulary_bytes = sys.getsizeof(vocabulary) + sum(sys.getsizeof(term) for term in vocabulary)
+
+        vocabulary_size = len(vocabulary)
+        if scale > 1 and vocabulary:
+            half_size = len(clone(transformer).fit(sample[:len(sample) // 2]).vocabulary_)
+            beta = np.clip(np.log(vocabulary_size / half_size) / np.log(2), 0, 1) if half_size else 1.0
+            vocabulary_size = vocabulary_size * scale ** beta
+            if getattr(transformer, 'max_features', None):
+                vocabulary_size = min(vocabulary_size, transformer.max_features)
+            vocabulary_bytes *= vocabulary_size / len(vocabulary)
+
+        # scipy switches the indices to int64 once they no longer fit in int32
+        nnz = X.nnz * scale
+        index_bytes = 4 if max(nnz, vocabulary_size) < 2 ** 31 else 8
+        rows.append({
+            'feature': name,
+            'vocabulary_size': vocabulary_size,
+            'vocabulary_bytes': vocabulary_bytes,
+            'dtype': X.dtype.name,
+            'nnz': nnz,
+            'matrix_bytes': nnz * (X.dtype.itemsize + index_bytes) + (n_documents + 1) * index_bytes,
+        })
+
+    report = pd.DataFrame(rows).set_index('feature')
+    numeric = ['vocabulary_size', 'vocabulary_bytes', 'nnz', 'matrix_bytes']
+    report.loc['total'] = report[numeric].sum()
+    report.loc['total', 'dtype'] = ''
+    report[numeric] = report[numeric].round().astype(np.int64)
+
+    return report
@@ -3,7 +3,10 @@
 # Description: An exemplary NLP pipeline with scikit-learn
 # Authors: Louis de Bruijn & Gaetana Ruggiero
 # Date: 11-03-2020
+# Usage: python pipeline.py --input FILE, from any directory; the repository root is added to the module
+#        search path so that the shared cross_validation package is found without installing it.
 
+import os
 import sys
 import argparse
 import logging
@@ -13,18 +16,33 @@ import numpy as np
 import seaborn as sn
 import pandas as pd
 import random
+import itertools
+import time
 
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.model_selection import StratifiedKFold
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.pipeline import Pipeline, FeatureUnion
-from sklearn.base import BaseEstimator, TransformerMixin
-from sklearn.feature_extraction import DictVectorizer
+from joblib import Parallel, delayed
+from scipy.sparse import hstack
 
-import nltk
 from nltk.probability import FreqDist
 import matplotlib.pyplot as plt
 
+# the script is run from nlp_pipeline/ or by path, the repository root holds the cross_validation package
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cross_validation.cv import BoostedKFold
+from cross_validation.split import take, train_test_indices
+
+from corpus_cache import load_corpus
+from features import base_transformers, memory_report
+# tokenize_pos is re-exported from its former location in this module
+from pos_tagging import batch_pos_tag, tokenize_pos  # noqa: F401
+from predict import save_model
+from profiling import Profiler
+from streaming import evaluate_streaming, split_held_out, train_streaming
+
 
 def parse_arguments():
     """Read arguments from a command line"""
@@ -35,6 +53,48 @@ def parse_arguments():
         help='txt file containing the data')
     parser.add_argument('--binary', action='store_true',
         help='Set if you want binary classification')
+    parser.add_argument('--cache-dir', metavar='DIR', default=None,
+        help='directory to cache the tokenized corpus in, keyed by the hash of the input file')
+    parser.add_argument('--pos', action='store_true',
+        help='Set if you want to append POS-tags to the tokens')
+    parser.add_argument('--pos-cache', metavar='FILE', default='.pos_cache.sqlite3',
+        help='SQLite file to cache POS-tags per document in')
+    parser.add_argument('--jobs', type=int, default=-1,
+        help='number of worker processes, -1 uses all cores')
+    parser.add_argument('--stream', action='store_true',
+        help='Set if you want to train out-of-core on hashed mini-batches of the input')
+    parser.add_argument('--batch-size', type=int, default=10000,
+        help='number of reviews per mini-batch in streaming mode')
+    parser.add_argument('--parity', action='store_true',
+        help='Set if you want to compare the streaming accuracy with the in-memory pipeline on the same split')
+    parser.add_argument('--experiments', action='store_true',
+        help='Set if you want to compare all feature combinations in one table')
+    parser.add_argument('--min-df', type=float, default=1,
+        help='ignore terms in fewer documents than this count (>= 1) or fraction (< 1)')
+    parser.add_argument('--max-df', type=float, default=1.0,
+        help='ignore terms in more documents than this count (> 1) or fraction (<= 1)')
+    parser.add_argument('--max-features', type=int, default=None,
+        help='keep only this many most frequent terms per vectorizer')
+    parser.add_argument('--stop-words', metavar='FILE', default=None,
+        help="file with a stop word on each line, or 'english'")
+    parser.add_argument('--float32', action='store_true',
+        help='Set if you want float32 instead of float64 feature matrices')
+    parser.add_argument('--memory-report', action='store_true',
+        help='Set if you want the estimated vocabulary size and matrix bytes per feature block before fitting')
+    parser.add_argument('--folds', type=int, default=None,
+        help='number of stratified cross-validation folds, evaluated in parallel instead of one train/test split')
+    parser.add_argument('--groups', metavar='FILE', default=None,
+        help='file with a group on each line per review, -1 for boosted reviews that are only used in training')
+    parser.add_argument('--stratify', action='store_true',
+        help='Set if you want the train/test split to keep the class distribution')
+    parser.add_argument('--seed', type=int, default=None,
+        help='seed for a reproducible train/test split')
+    parser.add_argument('--results', metavar='FILE', default=None,
+        help='.csv or .jsonl file to stream the per-document test results to')
+    parser.add_argument('--save-model', metavar='FILE', default=None,
+        help='file to save the fitted classifier to, for `predict.py`')
+    parser.add_argument('--profile', metavar='FILE', default=None,
+        help='JSON file to write the wall time, CPU time and peak memory per stage and transformer to')
 
     args = parser.parse_args()
     verbose = {0: logging.CRITICAL, 1: logging.ERROR, 2: logging.WARNING, 3: logging.INFO, 4: logging.DEBUG}
@@ -43,17 +103,23 @@ def parse_arguments():
     return args
 
 
-def read_corpus(corpus_file, binary):
+def read_corpus(corpus_file, binary, cache_dir=None):
     """Read input document and return the textual reviews and the sentiment or genre.
 
     :param corpus_file: newlime delimited file with a review on each line
     :type corpus_file: .txt file
     :param binary: flag for binary classification task
     :type binary: bool
+    :param cache_dir: directory with tokenized corpus caches, the file is tokenized only once if set
+    :type cache_dir: str
 
     :rtype: (list, list)
     :return: reviews, classes
     """
+    if cache_dir:
+        corpus = load_corpus(corpus_file, cache_dir)
+        return corpus.documents(), corpus.labels(binary)
+
     documents = []
     labels = []
     with open(corpus_file, 'r', encoding='utf-8') as f:
@@ -72,7 +138,7 @@ def read_corpus(corpus_file, binary):
     return documents, labels
 
 
-def shuffle_split(documents, labels, split):
+def shuffle_split(documents, labels, split, stratify=False, seed=None):
     """Shuffle data to ensure random class distribution in train/test split.
 
     :param documents: all textual reviews in corpus
@@ -81,22 +147,18 @@ def shuffle_split(documents, labels, split):
     :type labels: list of strings
     :param split: boundary for train/test sets
     :type split: int
+    :param stratify: flag for keeping the class distribution equal in train/test sets
+    :type stratify: bool
+    :param seed: seed for a reproducible split
+    :type seed: int
 
     :rtype: (list, list, list)
     :return: documents train-set, documents test-set, labels train-set, labels test-set
     """
-    tuples = [(doc, label) for doc, label in zip(documents, labels)]
-    random.shuffle(tuples)
-    X, Y = zip(*tuples)
-
-    split_point = int(split*len(X))
+    train, test = train_test_indices(len(labels), test_size=1 - split,
+                                     stratify=labels if stratify else None, random_state=seed)
 
-    Xtrain = X[:split_point]
-    Ytrain = Y[:split_point]
-    Xtest = X[split_point:]
-    Ytest = Y[split_point:]
-
-    return Xtrain, Xtest, Ytrain, Ytest
+    return take(documents, train), take(documents, test), take(labels, train), take(labels, test)
 
 
 def prior_probabilities(classes):
@@ -125,31 +187,7 @@ def baseline_classifier(Xtest, Ytest):
     return baseline
 
 
-def tokenize_pos(tokens):
-    """Add POS-tags to each token.
-
-    :param tokens: tokens (words) in a document
-    :type tokens: list of strings
-
-    :rtype: list of strings
-    :return: list of tokens with _POS-{pos-tag} appended to each token
-    """
-    return [token+"_POS-"+tag for token, tag in nltk.pos_tag(tokens)]
-
-
-class LengthFeatures(BaseEstimator, TransformerMixin):
-    """Feature engineer the length of each feature."""
-    def fit(self, x, y=None):
-        return self
-
-    def _get_features(self, doc):
-        return {"words": len(doc), "unique_words": len(set(doc))}
-
-    def transform(self, raw_documents):
-        return [self._get_features(doc) for doc in raw_documents]
-
-
-def feature_union(count, tfidf, textstats):
+def feature_union(count, tfidf, textstats, **vocabulary_options):
     """Add features the pipeline.
 
     :param count: flag for including count-vectorised tokens with POS-tags
@@ -158,21 +196,15 @@ def feature_union(count, tfidf, textstats):
     :type tfidf: bool
     :param textstats: flag for including length-features and mapping-based vectorised tokens
     :type textstats: bool
+    :param vocabulary_options: min_df, max_df, max_features, stop_words and dtype for the vectorizers
+    :type vocabulary_options: dict
 
     :rtype: sklearn.pipeline.Pipeline
     :return: classifier with all features included
     """
-    tfidf_vec = TfidfVectorizer(preprocessor=lambda x: x, tokenizer=lambda x: x)
-    count_vec = CountVectorizer(preprocessor=lambda x: x, tokenizer=lambda x: x, ngram_range=(2, 2))
-    length_vec = Pipeline([('textstats', LengthFeatures()), ('vec', DictVectorizer())])
-
-    features = []
-    if count:
-        features.append(('count', count_vec))
-    if tfidf:
-        features.append(('tfidf', tfidf_vec))
-    if textstats:
-        features.append(('textstats', length_vec))
+    flags = {'count': count, 'tfidf': tfidf, 'textstats': textstats}
+    features = [(name, transformer) for name, transformer in base_transformers(**vocabulary_options).items()
+                if flags[name]]
 
     if len(features) < 1:
         critical("Please select one or multiple features.")
@@ -184,38 +216,213 @@ def feature_union(count, tfidf, textstats):
     return classifier
 
 
-def tabular_results(Xtest, Ytest, Yguess, prior_prob, posterior_prob):
+def _evaluate_combination(names, train_blocks, test_blocks, Ytrain, Ytest):
+    """Fit and score MultinomialNB on horizontally stacked, already vectorised feature blocks."""
+    Xtrain = hstack(train_blocks, format='csr')
+    Xtest = hstack(test_blocks, format='csr')
+
+    start = time.perf_counter()
+    classifier = MultinomialNB().fit(Xtrain, Ytrain)
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    Yguess = classifier.predict(Xtest)
+    predict_time = time.perf_counter() - start
+
+    return {'features': ' + '.join(names), 'accuracy': accuracy_score(Ytest, Yguess),
+            'classifier_fit_time': fit_time, 'classifier_predict_time': predict_time}
+
+
+def run_experiments(Xtrain, Xtest, Ytrain, Ytest, n_jobs=-1, **vocabulary_options):
+    """Evaluate every combination of features, fitting each base transformer only once.
+
+    :param Xtrain: documents in train-set
+    :type Xtrain: list
+    :param Xtest: documents in test-set
+    :type Xtest: list
+    :param Ytrain: class labels in train-set
+    :type Ytrain: list
+    :param Ytest: class labels in test-set
+    :type Ytest: list
+    :param n_jobs: number of worker processes to train the combinations in
+    :type n_jobs: int
+    :param vocabulary_options: min_df, max_df, max_features, stop_words and dtype for the vectorizers
+    :type vocabulary_options: dict
+
+    :rtype: pandas.core.frame.DataFrame
+    :return: accuracy, fit time and predict time per feature combination, best first
+    """
+    train_blocks, test_blocks, fit_times, transform_times = {}, {}, {}, {}
+    for name, transformer in base_transformers(**vocabulary_options).items():
+        start = time.perf_counter()
+        train_blocks[name] = transformer.fit_transform(Xtrain)
+        fit_times[name] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        test_blocks[name] = transformer.transform(Xtest)
+        transform_times[name] = time.perf_counter() - start
+
+    combinations = [names for r in range(1, len(train_blocks) + 1) for names in itertools.combinations(train_blocks, r)]
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_evaluate_combination)(names, [train_blocks[name] for name in names],
+                                       [test_blocks[name] for name in names], Ytrain, Ytest)
+        for names in combinations)
+
+    # the cached transformer times count towards every combination that uses the transformer
+    for names, result in zip(combinations, results):
+        result['fit_time'] = sum(fit_times[name] for name in names) + result.pop('classifier_fit_time')
+        result['predict_time'] = sum(transform_times[name] for name in names) + result.pop('classifier_predict_time')
+
+    return pd.DataFrame(results).sort_values('accuracy', ascending=False).round(3).reset_index(drop=True)
+
+
+def _evaluate_fold(fold, Xtrain, Ytrain, Xtest, classes, vocabulary_options):
+    """Fit the pipeline on the training documents of one fold and predict its test documents."""
+    classifier = feature_union(count=False, tfidf=True, textstats=False, **vocabulary_options)
+
+    start = time.perf_counter()
+    classifier.fit(Xtrain, Ytrain)
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fold_prob = classifier.predict_proba(Xtest)
+    predict_time = time.perf_counter() - start
+
+    # a fold may lack a rare class, so align the columns with the classes of the whole corpus
+    posterior_prob = np.zeros((len(Xtest), len(classes)), dtype=fold_prob.dtype)
+    posterior_prob[:, np.searchsorted(classes, classifier.classes_)] = fold_prob
+
+    return fold, posterior_prob, fit_time, predict_time
+
+
+def cross_validate(documents, labels, n_folds=5, groups=None, seed=None, n_jobs=-1, **vocabulary_options):
+    """Evaluate the pipeline with stratified k-fold cross-validation, fitting the folds in parallel.
+
+    :param documents: all textual reviews in corpus
+    :type documents: list
+    :param labels: all class labels in corpus
+    :type labels: list
+    :param n_folds: number of folds
+    :type n_folds: int
+    :param groups: group per review, -1 for boosted reviews that are never tested, uses BoostedKFold if set
+    :type groups: numpy.ndarray
+    :param seed: seed for reproducible folds
+    :type seed: int
+    :param n_jobs: number of worker processes to fit the folds in
+    :type n_jobs: int
+    :param vocabulary_options: min_df, max_df, max_features, stop_words and dtype for the vectorizers
+    :type vocabulary_options: dict
+
+    :rtype: (pandas.core.frame.DataFrame, numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    :return: accuracy and timings per fold, indices of the tested reviews,
+        out-of-fold posterior probabilities of those reviews and the classes in their column order
+    """
+    y = np.asarray(labels)
+    classes = np.unique(y)
+    if groups is None:
+        cv = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+        splits = cv.split(np.zeros(len(y)), y)
+    else:
+        cv = BoostedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+        splits = cv.split(np.zeros(len(y)), y, np.asarray(groups))
+    splits = list(splits)
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_evaluate_fold)(fold, take(documents, train), y[train], take(documents, test), classes,
+                                vocabulary_options)
+        for fold, (train, test) in enumerate(splits))
+
+    # scatter the predictions of every fold back to the positions of its test reviews
+    tested = np.concatenate([test for _, test in splits])
+    posterior_prob = np.concatenate([fold_prob for _, fold_prob, _, _ in results])
+    order = np.argsort(tested, kind='stable')
+    tested, posterior_prob = tested[order], posterior_prob[order]
+
+    folds = pd.DataFrame([{
+        'fold': fold,
+        'n_train': len(splits[fold][0]),
+        'n_test': len(splits[fold][1]),
+        'accuracy': accuracy_score(y[splits[fold][1]], classes[fold_prob.argmax(axis=1)]),
+        'fit_time': fit_time,
+        'predict_time': predict_time,
+    } for fold, fold_prob, fit_time, predict_time in results]).set_index('fold')
+
+    return folds, tested, posterior_prob, classes
+
+
+def tabular_results(Xtest, Ytest, Yguess, prior_prob, posterior_prob, classes=None):
     """Return table with classification results.
 
     :param Xtest: documents in test-set
     :type Xtest: list
     :param Ytest: class labels in test-set
     :type Ytest: list
-    :param Yguess: predicted class labels for test-set
+    :param Yguess: predicted class labels for test-set, derived from posterior_prob and classes if None
     :type Yguess: list
     :param prior_prob: prior probabilities per document
     :type prior_prob: dict
     :param posterior_prob: posterior probabilities per document
     :type posterior_prob: numpy.ndarray
+    :param classes: class labels in the column order of posterior_prob, e.g. classifier.classes_
+    :type classes: numpy.ndarray
 
     :rtype: pandas.core.frame.DataFrame
     :return: Tabular results from the classifier including
         the tokenized sentence, true & predicted label
         prior & posterior probabilities
     """
-    maximum_array = posterior_prob.max(axis=1)
-
-    df = pd.DataFrame(columns=['sentence', 'true_label', 'prior_probabilities', 'predicted_label', 'posterior_probabilities'])
-    df['sentence'] = Xtest
-    df['true_label'] = Ytest
-    for index, row in df.iterrows():
-        row['prior_probabilities'] = prior_prob[row['true_label']]
-    df['predicted_label'] = Yguess
-    df['posterior_probabilities'] = np.around(maximum_array, 3)
+    # the argmax gives both the predicted class and the position of the maximum posterior probability
+    best = posterior_prob.argmax(axis=1)
+    maximum_array = np.take_along_axis(posterior_prob, best[:, np.newaxis], axis=1).ravel()
+    if Yguess is None:
+        Yguess = np.asarray(classes)[best]
+
+    true_label = pd.Series(np.asarray(Ytest, dtype=object))
+    df = pd.DataFrame({
+        'sentence': pd.Series(list(Xtest), dtype=object),
+        'true_label': true_label,
+        'prior_probabilities': true_label.map(prior_prob),
+        'predicted_label': np.asarray(Yguess, dtype=object),
+        'posterior_probabilities': np.around(maximum_array, 3),
+    })
 
     return df
 
 
+def write_results(results_file, Xtest, Ytest, Yguess, prior_prob, posterior_prob, chunk_size=100000):
+    """Stream the classification results to a CSV or JSON Lines file, one chunk of rows at a time.
+
+    :param results_file: .csv or .jsonl file to write the results to
+    :type results_file: str
+    :param Xtest: documents in test-set
+    :type Xtest: list
+    :param Ytest: class labels in test-set
+    :type Ytest: list
+    :param Yguess: predicted class labels for test-set
+    :type Yguess: list
+    :param prior_prob: prior probabilities per document
+    :type prior_prob: dict
+    :param posterior_prob: posterior probabilities per document
+    :type posterior_prob: numpy.ndarray
+    :param chunk_size: number of rows held in memory at once
+    :type chunk_size: int
+    """
+    jsonl = results_file.endswith(('.jsonl', '.json'))
+    with open(results_file, 'w', encoding='utf-8', newline='') as f:
+        for start in range(0, len(Ytest), chunk_size):
+            end = start + chunk_size
+            df = tabular_results(Xtest[start:end], Ytest[start:end], Yguess[start:end], prior_prob,
+                                 posterior_prob[start:end])
+            df['sentence'] = df['sentence'].str.join(' ')
+
+            if jsonl:
+                # older pandas versions omit the newline after the last record
+                lines = df.to_json(orient='records', lines=True, force_ascii=False)
+                f.write(lines if lines.endswith('\n') else lines + '\n')
+            else:
+                df.to_csv(f, header=start == 0, index=False)
+
+
 def class_report(label, Ytest, Yguess, show_matrix):
     """Show classification report and accuracy scores.
 
@@ -258,28 +465,132 @@ def vis(conf_mat, labels):
     plt.show()
 
 
+def vocabulary_options():
+    """Collect the vocabulary and dtype options for the vectorizers from the command line."""
+    stop_words = args.stop_words
+    if stop_words and stop_words != 'english':
+        with open(stop_words, 'r', encoding='utf-8') as f:
+            stop_words = [line.strip() for line in f if line.strip()]
+
+    return {
+        'min_df': int(args.min_df) if args.min_df >= 1 else args.min_df,
+        'max_df': int(args.max_df) if args.max_df > 1 else args.max_df,
+        'max_features': args.max_features,
+        'stop_words': stop_words,
+        'dtype': np.float32 if args.float32 else np.float64,
+    }
+
+
+def cross_validation_main(X, Y, prior_prob):
+    """Report the k-fold cross-validated accuracy and the out-of-fold predictions."""
+    groups = None
+    if args.groups:
+        groups = np.loadtxt(args.groups, dtype=np.int64, ndmin=1)
+
+    folds, tested, posterior_prob, classes = cross_validate(X, Y, args.folds, groups, args.seed, args.jobs,
+                                                            **vocabulary_options())
+    info(folds.round(3).to_string())
+    info('accuracy over {0} folds: {1:.3f} (+/- {2:.3f})'.format(
+        args.folds, folds['accuracy'].mean(), folds['accuracy'].std()))
+    info('fit time per fold: {0:.3f}s, predict time per fold: {1:.3f}s'.format(
+        folds['fit_time'].mean(), folds['predict_time'].mean()))
+
+    Xtested, Ytested = take(X, tested), take(Y, tested)
+    Yguess = classes[posterior_prob.argmax(axis=1)]
+    if args.results:
+        write_results(args.results, Xtested, Ytested, Yguess, prior_prob, posterior_prob)
+
+    class_report("Naive Bayes classifier, out-of-fold", Ytested, Yguess, show_matrix=True)
+
+
+def stream_main():
+    """Train and evaluate out-of-core, optionally comparing the accuracy with the in-memory pipeline."""
+    vectorizer, classifier = train_streaming(args.input, args.binary, args.batch_size)
+    accuracy, n_test = evaluate_streaming(vectorizer, classifier, args.input, args.binary, args.batch_size)
+    info('accuracy score for streaming Naive Bayes classifier on {0} held-out reviews: {1}'.format(
+        n_test, round(accuracy, 3)))
+
+    if args.parity:
+        X, Y = read_corpus(args.input, args.binary, args.cache_dir)
+        Xtrain, Xtest, Ytrain, Ytest = split_held_out(X, Y)
+
+        classifier = feature_union(count=False, tfidf=True, textstats=False)
+        classifier.fit(Xtrain, Ytrain)
+        info('accuracy score for in-memory Naive Bayes classifier on the same reviews: {0}'.format(
+            round(accuracy_score(Ytest, classifier.predict(Xtest)), 3)))
+
+
 def main():
 
-    X, Y = read_corpus(args.input, args.binary)
+    if args.stream:
+        stream_main()
+        return
 
-    Xtrain, Xtest, Ytrain, Ytest = shuffle_split(X, Y, 0.8)
+    profiler = Profiler(enabled=bool(args.profile))
 
-    prior_prob = prior_probabilities(Y)
-    info('Prior probabilities per class: {0}'.format(prior_prob))
+    with profiler.stage('read'):
+        X, Y = read_corpus(args.input, args.binary, args.cache_dir)
+    if args.pos:
+        with profiler.stage('pos_tag'):
+            X = batch_pos_tag(X, cache_file=args.pos_cache, n_jobs=args.jobs)
+
+    if args.memory_report:
+        # estimated from a sample before any fit, for all feature blocks the experiments may combine
+        with profiler.stage('memory_report'):
+            union = FeatureUnion(list(base_transformers(**vocabulary_options()).items()))
+            info(memory_report(union, X).to_string())
 
-    classifier = feature_union(count=False, tfidf=True, textstats=False)
-    classifier.fit(Xtrain, Ytrain)  # fit the classifier on the training set
-    Yguess = classifier.predict(Xtest)  # predict the labels on the test set
-    posterior_prob = classifier.predict_proba(Xtest)  # calculate posterior probabilities
+    if args.folds:
+        with profiler.stage('cross_validation'):
+            cross_validation_main(X, Y, prior_probabilities(Y))
+        if args.profile:
+            profiler.write(args.profile)
+        return
 
-    df = tabular_results(Xtest, Ytest, Yguess, prior_prob, posterior_prob)
-    with pd.option_context('display.max_rows', 10, 'display.max_columns', None):
-        debug(df)
+    with profiler.stage('split'):
+        Xtrain, Xtest, Ytrain, Ytest = shuffle_split(X, Y, 0.8, args.stratify, args.seed)
 
-    baseline = baseline_classifier(Xtest, Ytest)
-    class_report("Baseline classifier", Ytest, baseline, show_matrix=False)
+    prior_prob = prior_probabilities(Y)
+    info('Prior probabilities per class: {0}'.format(prior_prob))
 
-    class_report("Naive Bayes classifier", Ytest, Yguess, show_matrix=True)
+    if args.experiments:
+        with profiler.stage('experiments'):
+            info(run_experiments(Xtrain, Xtest, Ytrain, Ytest, n_jobs=args.jobs, **vocabulary_options()).to_string())
+        if args.profile:
+            profiler.write(args.profile)
+        return
+
+    classifier = feature_union(count=False, tfidf=True, textstats=False, **vocabulary_options())
+    profiler.wrap_transformers(classifier)
+    with profiler.stage('fit'):
+        classifier.fit(Xtrain, Ytrain)  # fit the classifier on the training set
+    with profiler.stage('predict'):
+        Yguess = classifier.predict(Xtest)  # predict the labels on the test set
+    with profiler.stage('predict_proba'):
+        posterior_prob = classifier.predict_proba(Xtest)  # calculate posterior probabilities
+    profiler.unwrap_transformers(classifier)
+
+    with profiler.stage('report'):
+        if args.results:
+            write_results(args.results, Xtest, Ytest, Yguess, prior_prob, posterior_prob)
+        else:
+            df = tabular_results(Xtest, Ytest, Yguess, prior_prob, posterior_prob)
+            with pd.option_context('display.max_rows', 10, 'display.max_columns', None):
+                debug(df)
+
+        baseline = baseline_classifier(Xtest, Ytest)
+        class_report("Baseline classifier", Ytest, baseline, show_matrix=False)
+
+        class_report("Naive Bayes classifier", Ytest, Yguess, show_matrix=True)
+
+    if args.save_model:
+        with profiler.stage('save_model'):
+            save_model(classifier, args.save_model)
+        info('Saved classifier to {0}'.format(args.save_model))
+
+    if args.profile:
+        profiler.write(args.profile)
+        info('Wrote profile to {0}'.format(args.profile))
 
 
 if __name__ == '__main__':
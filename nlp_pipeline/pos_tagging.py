@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# File name: pos_tagging.py
+# Description: Parallel POS-tagging of documents with an on-disk cache keyed by document hash
+# Author: Louis de Bruijn
+# Date: 19-10-2026
+
+import hashlib
+import sqlite3
+import time
+from contextlib import closing
+from logging import info
+
+import nltk
+from joblib import Parallel, delayed
+
+
+def tokenize_pos(tokens):
+    """Add POS-tags to each token.
+
+    :param tokens: tokens (words) in a document
+    :type tokens: list of strings
+
+    :rtype: list of strings
+    :return: list of tokens with _POS-{pos-tag} appended to each token
+    """
+    return [token + "_POS-" + tag for token, tag in nltk.pos_tag(tokens)]
+
+
+def document_hash(tokens):
+    """Hash the tokens of a document, so equal documents share one cache entry.
+
+    :param tokens: tokens (words) in a document
+    :type tokens: list of strings
+
+    :rtype: str
+    :return: hexadecimal SHA-1 digest of the tokens
+    """
+    return hashlib.sha1('\x1f'.join(tokens).encode('utf-8')).hexdigest()
+
+
+def _tag_chunk(documents):
+    """POS-tag a chunk of documents in a worker process, returning only the tags."""
+    return [' '.join(tag for _, tag in nltk.pos_tag(tokens)) for tokens in documents]
+
+
+def _read_cache(connection, hashes, batch_size=900):
+    """Fetch cached tags for the given document hashes, in batches below SQLite's variable limit."""
+    cached = {}
+    for start in range(0, len(hashes), batch_size):
+        batch = hashes[start:start + batch_size]
+        query = 'SELECT hash, tags FROM pos_tags WHERE hash IN ({0})'.format(', '.join('?' * len(batch)))
+        cached.update(connection.execute(query, batch))
+
+    return cached
+
+
+def batch_pos_tag(documents, cache_file='.pos_cache.sqlite3', n_jobs=-1, chunk_size=500):
+    """POS-tag documents across a process pool, only tagging documents that are not cached yet.
+
+    :param documents: tokens (words) per document
+    :type documents: list of lists of strings
+    :param cache_file: SQLite file with the POS-tags per document hash
+    :type cache_file: str
+    :param n_jobs: number of worker processes, -1 uses all cores
+    :type n_jobs: int
+    :param chunk_size: number of documents sent to a worker at once
+    :type chunk_size: int
+
+    :rtype: list of lists of strings
+    :return: per document, the tokens with _POS-{pos-tag} appended to each token
+    """
+    hashes = [document_hash(tokens) for tokens in documents]
+
+    with closing(sqlite3.connect(cache_file)) as connection:
+        connection.execute('CREATE TABLE IF NOT EXISTS pos_tags (hash TEXT PRIMARY KEY, tags TEXT NOT NULL)')
+        cached = _read_cache(connection, list(set(hashes)))
+
+        # tag every unseen document once, even if it occurs multiple times in the corpus
+        missing = {}
+        for doc_hash, tokens in zip(hashes, documents):
+            if doc_hash not in cached:
+                missing.setdefault(doc_hash, tokens)
+        missing_hashes, missing_documents = list(missing), list(missing.values())
+
+        start = time.perf_counter()
+        chunks = [missing_documents[i:i + chunk_size] for i in range(0, len(missing_documents), chunk_size)]
+        tagged = Parallel(n_jobs=n_jobs)(delayed(_tag_chunk)(chunk) for chunk in chunks)
+        new_tags = [tags for chunk in tagged for tags in chunk]
+        seconds = time.perf_counter() - start
+
+        with connection:
+            connection.executemany('INSERT OR REPLACE INTO pos_tags (hash, tags) VALUES (?, ?)',
+                                   zip(missing_hashes, new_tags))
+        cached.update(zip(missing_hashes, new_tags))
+
+    if missing_documents:
+        info('POS-tagged {0} new documents in {1:.2f}s ({2:.0f} docs/sec), {3} reused from cache or duplicates'.format(
+            len(missing_documents), seconds, len(missing_documents) / seconds, len(documents) - len(missing_documents)))
+    else:
+        info('POS-tags for all {0} documents from cache'.format(len(documents)))
+
+    return [[token + "_POS-" + tag for token, tag in zip(tokens, cached[doc_hash].split())]
+            for doc_hash, tokens in zip(hashes, documents)]
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# File name: predict.py
+# Description: Saves a fitted NLP pipeline as a compact artifact and classifies text with it in streaming batches
+# Author: Louis de Bruijn
+# Date: 19-10-2026
+
+import argparse
+import json
+import logging
+import sys
+import time
+from itertools import islice
+from logging import info
+
+import numpy as np
+
+# scikit-learn is only imported to save a model, loading and predicting need numpy only
+ARTIFACT_FORMAT = 1
+
+
+def _vectorizer_block(transformer):
+    """Describe a fitted Count- or TfidfVectorizer by its settings and its vocabulary as sorted arrays."""
+    from features import StopWordFilter, identity
+
+    analyzer = transformer.analyzer
+    if getattr(analyzer, '__func__', None) is StopWordFilter.bigrams:
+        # bigrams with a stop word are not in the vocabulary, so counting all bigrams gives the same features
+        ngram_range = (2, 2)
+    elif analyzer == 'word' and (transformer.tokenizer is identity or isinstance(transformer.tokenizer, StopWordFilter)):
+        ngram_range = transformer.ngram_range
+    else:
+        raise ValueError('Only vectorizers of pre-tokenized documents from `base_transformers` can be saved.')
+
+    # UTF-8 bytes sort in the same order as their strings, and take a quarter of the memory of a unicode array
+    terms = np.array([term.encode('utf-8') for term in transformer.vocabulary_])
+    columns = np.fromiter(transformer.vocabulary_.values(), dtype=np.int32, count=len(terms))
+    order = np.argsort(terms, kind='stable')
+    block = {
+        'kind': 'vectorizer',
+        'ngram_range': list(ngram_range),
+        'binary': bool(transformer.binary),
+        'n_features': len(terms),
+        'sublinear_tf': bool(getattr(transformer, 'sublinear_tf', False)),
+        'norm': getattr(transformer, 'norm', None),
+    }
+    arrays = {'terms': terms[order], 'columns': columns[order]}
+    if getattr(transformer, 'use_idf', False):
+        arrays['idf'] = transformer.idf_.astype(np.float32)
+
+    return block, arrays
+
+
+def save_model(classifier, model_file):
+    """Save a fitted pipeline as a compact, fast-loading artifact of plain arrays.
+
+    The vocabularies are saved as sorted arrays of UTF-8 terms with their column ids, the weights in float32.
+    Loading the artifact needs neither pickle nor scikit-learn.
+
+    :param classifier: fitted pipeline from ``feature_union``
+    :type classifier: sklearn.pipeline.Pipeline
+    :param model_file: file path for the artifact
+    :type model_file: str
+    """
+    from features import LengthFeatures
+
+    blocks = []
+    arrays = {}
+    for index, (_, transformer) in enumerate(classifier.named_steps['vec'].transformer_list):
+        if isinstance(transformer, LengthFeatures):
+            block = {'kind': 'textstats', 'n_features': 2}
+        else:
+            block, block_arrays = _vectorizer_block(transformer)
+            arrays.update({'{0}_{1}'.format(name, index): array for name, array in block_arrays.items()})
+        blocks.append(block)
+
+    nb = classifier.named_steps['cls']
+    arrays.update({
+        'classes': np.asarray(nb.classes_.tolist()),
+        'class_log_prior': nb.class_log_prior_.astype(np.float32),
+        'feature_log_prob': nb.feature_log_prob_.astype(np.float32),
+        'meta': np.array(json.dumps({'format': ARTIFACT_FORMAT, 'blocks': blocks})),
+    })
+    # a file object keeps numpy from appending .npz to the file name
+    with open(model_file, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+class CompactClassifier:
+    """Multinomial naive Bayes over the feature union of a saved pipeline, computed with numpy only.
+
+    It predicts the same probabilities as the pipeline it was saved from, for the feature blocks of
+    ``base_transformers``. Tokens are looked up by binary search in the sorted term arrays, so no vocabulary
+    dict is built.
+    """
+    def __init__(self, arrays):
+        """
+        :param arrays: arrays of an artifact saved with :func:`save_model`
+        :type arrays: dict
+        """
+        meta = json.loads(str(arrays['meta']))
+        if meta['format'] != ARTIFACT_FORMAT:
+            raise ValueError('Unsupported model format {0}, save the model again.'.format(meta['format']))
+
+        self.blocks = meta['blocks']
+        for index, block in enumerate(self.blocks):
+            for name in ('terms', 'columns', 'idf'):
+                block[name] = arrays.get('{0}_{1}'.format(name, index))
+        self.classes_ = arrays['classes']
+        self.class_log_prior_ = arrays['class_log_prior']
+        self.feature_log_prob_ = arrays['feature_log_prob']
+
+    @staticmethod
+    def _ngrams(tokens, ngram_range):
+        """Join the n-grams of a document as ``CountVectorizer`` does."""
+        min_n, max_n = ngram_range
+        return [' '.join(tokens[i:i + n]) for n in range(min_n, max_n + 1) for i in range(len(tokens) - n + 1)]
+
+    def _vectorize(self, block, documents):
+        """Return the rows, columns and values of the non-zero features of a vectorizer block."""
+        n_documents = len(documents)
+        grams = [self._ngrams(tokens, block['ngram_range']) for tokens in documents]
+        lengths = np.fromiter((len(doc) for doc in grams), dtype=np.int64, count=n_documents)
+        tokens = np.array([gram.encode('utf-8') for doc in grams for gram in doc])
+        terms = block['terms']
+        if not len(tokens) or not len(terms):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+
+        positions = np.minimum(np.searchsorted(terms, tokens), len(terms) - 1)
+        found = terms[positions] == tokens
+        rows = np.repeat(np.arange(n_documents), lengths)[found]
+        columns = block['columns'][positions[found]].astype(np.int64)
+
+        keys, counts = np.unique(rows * block['n_features'] + columns, return_counts=True)
+        rows, columns = np.divmod(keys, block['n_features'])
+        values = np.ones(len(counts)) if block['binary'] else counts.astype(np.float64)
+        if block['sublinear_tf']:
+            values = np.log(values) + 1
+        if block['idf'] is not None:
+            values *= block['idf'][columns]
+        if block['norm'] == 'l2':
+            values /= np.sqrt(np.bincount(rows, weights=values ** 2, minlength=n_documents))[rows]
+        elif block['norm'] == 'l1':
+            values /= np.bincount(rows, weights=np.abs(values), minlength=n_documents)[rows]
+
+        return rows, columns, values
+
+    @staticmethod
+    def _text_statistics(documents):
+        """Return the rows, columns and values of the unique word and word counts, as ``LengthFeatures``."""
+        n_documents = len(documents)
+        unique_words = np.fromiter((len(set(doc)) for doc in documents), dtype=np.float64, count=n_documents)
+        words = np.fromiter((len(doc) for doc in documents), dtype=np.float64, count=n_documents)
+
+        values = np.column_stack((unique_words, words)).ravel()
+
+        return np.repeat(np.arange(n_documents), 2), np.tile([0, 1], n_documents), values
+
+    def predict_proba(self, documents):
+        """Predict the class probabilities of tokenized documents.
+
+        :param documents: tokens per document
+        :type documents: list of lists
+
+        :rtype: numpy.ndarray
+        :return: probabilities of shape (n_documents, n_classes), in the order of ``classes_``
+        """
+        n_documents = len(documents)
+        joint_log_likelihood = np.tile(self.class_log_prior_.astype(np.float64), (n_documents, 1))
+
+        offset = 0
+        for block in self.blocks:
+            if block['kind'] == 'textstats':
+                rows, columns, values = self._text_statistics(documents)
+            else:
+                rows, columns, values = self._vectorize(block, documents)
+            # the features are sparse, so the log-likelihood is summed over the non-zeros per class
+            for label, log_prob in enumerate(self.feature_log_prob_):
+                joint_log_likelihood[:, label] += np.bincount(
+                    rows, weights=values * log_prob[columns + offset], minlength=n_documents)
+            offset += block['n_features']
+
+        joint_log_likelihood -= joint_log_likelihood.max(axis=1, keepdims=True)
+        probabilities = np.exp(joint_log_likelihood)
+
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def predict(self, documents):
+        """Predict the class of tokenized documents.
+
+        :param documents: tokens per document
+        :type documents: list of lists
+
+        :rtype: numpy.ndarray
+        :return: predicted class per document
+        """
+        return self.classes_[self.predict_proba(documents).argmax(axis=1)]
+
+
+def load_model(model_file):
+    """Load an artifact saved with :func:`save_model`.
+
+    :param model_file: file path for the artifact
+    :type model_file: str
+
+    :rtype: CompactClassifier
+    :return: classifier with ``predict`` and ``predict_proba``
+    """
+    with np.load(model_file, allow_pickle=False) as arrays:
+        return CompactClassifier({name: arrays[name] for name in arrays.files})
+
+
+def predict_stream(classifier, lines, corpus_format=False, batch_size=1000):
+    """Classify lines of text in batches, without reading all lines into memory.
+
+    :param classifier: fitted pipeline
+    :type classifier: sklearn.pipeline.Pipeline
+    :param lines: lines of whitespace-tokenized text
+    :type lines: iterable of strings
+    :param corpus_format: flag for lines in the corpus format, of which the first three tokens are not text
+    :type corpus_format: bool
+    :param batch_size: number of lines to classify at once
+    :type batch_size: int
+
+    :rtype: generator of (str, float)
+    :return: predicted label and its posterior probability per line
+    """
+    lines = iter(lines)
+    while True:
+        batch = [line.strip().split() for line in islice(lines, batch_size)]
+        if not batch:
+            break
+        if corpus_format:
+            batch = [tokens[3:] for tokens in batch]
+
+        posterior_prob = classifier.predict_proba(batch)
+        labels = classifier.classes_[posterior_prob.argmax(axis=1)]
+        yield from zip(labels, posterior_prob.max(axis=1))
+
+
+def parse_arguments():
+    """Read arguments from a command line"""
+    parser = argparse.ArgumentParser(description='Classify text with a saved NLP pipeline')
+    parser.add_argument('--model', metavar='FILE', required=True,
+        help='artifact saved with `pipeline.py --save-model`')
+    parser.add_argument('--input', metavar='FILE', default=None,
+        help='txt file with a text on each line, reads stdin if not set')
+    parser.add_argument('--corpus-format', action='store_true',
+        help='Set if the lines are in the corpus format: label, label, id, text')
+    parser.add_argument('--batch-size', type=int, default=1000,
+        help='number of lines to classify at once')
+
+    args = parser.parse_args()
+    # predictions go to stdout, so log messages go to stderr
+    logging.basicConfig(format='%(message)s', level=logging.INFO, stream=sys.stderr)
+
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+
+    start = time.perf_counter()
+    classifier = load_model(args.model)
+    info('Loaded model in {0:.3f}s'.format(time.perf_counter() - start))
+
+    f = open(args.input, 'r', encoding='utf-8') if args.input else sys.stdin
+    with f:
+        for label, probability in predict_stream(classifier, f, args.corpus_format, args.batch_size):
+            sys.stdout.write('{0}\t{1:.3f}\n'.format(label, probability))
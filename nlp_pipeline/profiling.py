@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# File name: profiling.py
+# Description: Opt-in wall time, CPU time and peak memory profiling of the stages of the NLP pipeline
+# Author: Louis de Bruijn
+# Date: 19-10-2026
+
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging import info
+
+from sklearn.base import BaseEstimator, TransformerMixin
+
+
+class TimedTransformer(BaseEstimator, TransformerMixin):
+    """Wrap a transformer of a FeatureUnion to accumulate the time spent fitting and transforming."""
+    def __init__(self, transformer):
+        self.transformer = transformer
+
+    def fit(self, X, y=None):
+        start = time.perf_counter()
+        self.transformer.fit(X, y)
+        self.fit_time_ = time.perf_counter() - start
+        self.transform_time_, self.transform_calls_ = 0.0, 0
+        return self
+
+    def fit_transform(self, X, y=None):
+        start = time.perf_counter()
+        Xt = self.transformer.fit_transform(X, y)
+        self.fit_time_ = time.perf_counter() - start
+        self.transform_time_, self.transform_calls_ = 0.0, 0
+        return Xt
+
+    def transform(self, X):
+        start = time.perf_counter()
+        Xt = self.transformer.transform(X)
+        self.transform_time_ += time.perf_counter() - start
+        self.transform_calls_ += 1
+        return Xt
+
+    def get_feature_names_out(self, input_features=None):
+        return self.transformer.get_feature_names_out(input_features)
+
+
+class Profiler:
+    """Record wall time, CPU time and peak traced memory per stage of a run.
+
+    A disabled profiler runs the stages without measuring them, so the calling code needs no conditionals.
+    Tracing memory slows down allocation-heavy stages such as tokenization, hence it is opt-in.
+    """
+    def __init__(self, enabled=True):
+        """
+        :param enabled: flag for measuring the stages
+        :type enabled: bool
+        """
+        self.enabled = enabled
+        self.stages = []
+        self.transformers = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Measure the code in the with-block as one stage.
+
+        :param name: name of the stage in the report
+        :type name: str
+        """
+        if not self.enabled:
+            yield
+            return
+
+        started_tracing = not tracemalloc.is_tracing()
+        if not started_tracing and hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        else:
+            # (re)starting resets the peak, also on Python 3.8 which lacks reset_peak
+            tracemalloc.stop()
+            tracemalloc.start()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+            self.stages.append({'stage': name, 'wall_time': wall, 'cpu_time': cpu, 'peak_memory_mb': peak / 2 ** 20})
+            info('{0}: {1:.3f}s wall, {2:.3f}s CPU, {3:.1f} MB peak'.format(name, wall, cpu, peak / 2 ** 20))
+
+    def wrap_transformers(self, classifier):
+        """Time every transformer of the FeatureUnion of a pipeline from ``feature_union``.
+
+        :param classifier: unfitted pipeline
+        :type classifier: sklearn.pipeline.Pipeline
+
+        :rtype: sklearn.pipeline.Pipeline
+        :return: the same pipeline, modified in place
+        """
+        if self.enabled:
+            union = classifier.named_steps['vec']
+            union.transformer_list = [(name, TimedTransformer(transformer))
+                                      for name, transformer in union.transformer_list]
+
+        return classifier
+
+    def unwrap_transformers(self, classifier):
+        """Collect the transformer timings and restore the original transformers, e.g. before saving the pipeline.
+
+        :param classifier: pipeline passed to :meth:`wrap_transformers`
+        :type classifier: sklearn.pipeline.Pipeline
+
+        :rtype: sklearn.pipeline.Pipeline
+        :return: the same pipeline, modified in place
+        """
+        union = classifier.named_steps['vec']
+        transformer_list = []
+        for name, transformer in union.transformer_list:
+            if isinstance(transformer, TimedTransformer):
+                self.transformers[name] = {
+                    'fit_time': getattr(transformer, 'fit_time_', None),
+                    'transform_time': getattr(transformer, 'transform_time_', None),
+                    'transform_calls': getattr(transformer, 'transform_calls_', 0),
+                }
+                transformer = transformer.transformer
+            transformer_list.append((name, transformer))
+        union.transformer_list = transformer_list
+
+        return classifier
+
+    def report(self):
+        """Return the measurements with enough context to compare runs over time.
+
+        :rtype: dict
+        :return: run metadata, measurements per stage and timings per transformer
+        """
+        return {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'command': sys.argv,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'total_wall_time': sum(stage['wall_time'] for stage in self.stages),
+            'stages': self.stages,
+            'transformers': self.transformers,
+        }
+
+    def write(self, report_file):
+        """Write the report as JSON.
+
+        :param report_file: file path for the JSON report
+        :type report_file: str
+        """
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# File name: streaming.py
+# Description: Out-of-core training of the NLP pipeline with hashed features and partial_fit
+# Author: Louis de Bruijn
+# Date: 19-10-2026
+
+import zlib
+from itertools import islice
+
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.naive_bayes import MultinomialNB
+
+from features import identity
+
+
+def is_held_out(line_number, test_fraction=0.2, seed=0):
+    """Decide deterministically whether a line belongs to the held-out stream.
+
+    Hashing the line number gives the same split on every pass over the file, without keeping an index in memory.
+
+    :param line_number: index of the line in the corpus file
+    :type line_number: int
+    :param test_fraction: fraction of lines that is held out
+    :type test_fraction: float
+    :param seed: seed that selects a different split
+    :type seed: int
+
+    :rtype: bool
+    :return: whether the line is held out for evaluation
+    """
+    return zlib.crc32('{0}:{1}'.format(seed, line_number).encode()) % 10000 < test_fraction * 10000
+
+
+def iter_corpus(corpus_file, binary):
+    """Stream the tokens and label of each review without reading the whole file.
+
+    :param corpus_file: newline delimited file with a review on each line
+    :type corpus_file: str
+    :param binary: flag for binary classification task
+    :type binary: bool
+
+    :rtype: generator of (list, str)
+    :return: tokens and class label per review
+    """
+    with open(corpus_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            tokens = line.strip().split()
+            # 2-class problem: positive vs negative, 6-class problem: books, camera, dvd, health, music, software
+            yield tokens[3:], tokens[1] if binary else tokens[0]
+
+
+def iter_batches(corpus_file, binary, batch_size=10000, held_out=False, test_fraction=0.2, seed=0):
+    """Stream mini-batches of either the training or the held-out part of the corpus.
+
+    :param corpus_file: newline delimited file with a review on each line
+    :type corpus_file: str
+    :param binary: flag for binary classification task
+    :type binary: bool
+    :param batch_size: number of reviews per mini-batch
+    :type batch_size: int
+    :param held_out: flag for streaming the held-out instead of the training reviews
+    :type held_out: bool
+    :param test_fraction: fraction of lines that is held out
+    :type test_fraction: float
+    :param seed: seed that selects a different split
+    :type seed: int
+
+    :rtype: generator of (list, list)
+    :return: reviews, classes per mini-batch
+    """
+    stream = (review for i, review in enumerate(iter_corpus(corpus_file, binary))
+              if is_held_out(i, test_fraction, seed) == held_out)
+    while True:
+        batch = list(islice(stream, batch_size))
+        if not batch:
+            break
+        documents, labels = zip(*batch)
+        yield list(documents), list(labels)
+
+
+def split_held_out(documents, labels, test_fraction=0.2, seed=0):
+    """Split an in-memory corpus exactly like the streams, to compare both modes on the same reviews.
+
+    :param documents: all textual reviews in corpus
+    :type documents: list
+    :param labels: all class labels in corpus
+    :type labels: list
+    :param test_fraction: fraction of lines that is held out
+    :type test_fraction: float
+    :param seed: seed that selects a different split
+    :type seed: int
+
+    :rtype: (list, list, list, list)
+    :return: documents train-set, documents test-set, labels train-set, labels test-set
+    """
+    held_out = [is_held_out(i, test_fraction, seed) for i in range(len(documents))]
+    Xtrain = [doc for doc, test in zip(documents, held_out) if not test]
+    Xtest = [doc for doc, test in zip(documents, held_out) if test]
+    Ytrain = [label for label, test in zip(labels, held_out) if not test]
+    Ytest = [label for label, test in zip(labels, held_out) if test]
+
+    return Xtrain, Xtest, Ytrain, Ytest
+
+
+def hashing_vectorizer(n_features=2 ** 20):
+    """Stateless vectorizer: no vocabulary is kept, so memory does not grow with the corpus.
+
+    :param n_features: number of hashed feature columns
+    :type n_features: int
+
+    :rtype: sklearn.feature_extraction.text.HashingVectorizer
+    :return: vectorizer for pre-tokenized reviews
+    """
+    # counts must be non-negative for MultinomialNB, hence no alternating sign
+    return HashingVectorizer(preprocessor=identity, tokenizer=identity, token_pattern=None,
+                             lowercase=False, alternate_sign=False, n_features=n_features)
+
+
+def train_streaming(corpus_file, binary, batch_size=10000, test_fraction=0.2, seed=0, n_features=2 ** 20):
+    """Train MultinomialNB with partial_fit on hashed mini-batches of the training stream.
+
+    :param corpus_file: newline delimited file with a review on each line
+    :type corpus_file: str
+    :param binary: flag for binary classification task
+    :type binary: bool
+    :param batch_size: number of reviews per mini-batch
+    :type batch_size: int
+    :param test_fraction: fraction of lines that is held out
+    :type test_fraction: float
+    :param seed: seed that selects a different split
+    :type seed: int
+    :param n_features: number of hashed feature columns
+    :type n_features: int
+
+    :rtype: (HashingVectorizer, MultinomialNB)
+    :return: vectorizer and trained classifier
+    """
+    # partial_fit needs all classes up front, which takes a cheap first pass over the labels only
+    classes = sorted({label for _, label in iter_corpus(corpus_file, binary)})
+
+    vectorizer = hashing_vectorizer(n_features)
+    classifier = MultinomialNB()
+    for documents, labels in iter_batches(corpus_file, binary, batch_size, False, test_fraction, seed):
+        classifier.partial_fit(vectorizer.transform(documents), labels, classes=classes)
+
+    return vectorizer, classifier
+
+
+def evaluate_streaming(vectorizer, classifier, corpus_file, binary, batch_size=10000, test_fraction=0.2, seed=0):
+    """Compute the accuracy on the held-out stream, one mini-batch at a time.
+
+    :param vectorizer: stateless vectorizer used in training
+    :type vectorizer: sklearn.feature_extraction.text.HashingVectorizer
+    :param classifier: trained classifier
+    :type classifier: sklearn.naive_bayes.MultinomialNB
+    :param corpus_file: newline delimited file with a review on each line
+    :type corpus_file: str
+    :param binary: flag for binary classification task
+    :type binary: bool
+    :param batch_size: number of reviews per mini-batch
+    :type batch_size: int
+    :param test_fraction: fraction of lines that is held out
+    :type test_fraction: float
+    :param seed: seed that selects a different split
+    :type seed: int
+
+    :rtype: (float, int)
+    :return: accuracy and number of held-out reviews
+    """
+    correct = total = 0
+    for documents, labels in iter_batches(corpus_file, binary, batch_size, True, test_fraction, seed):
+        Yguess = classifier.predict(vectorizer.transform(documents))
+        correct += sum(guess == label for guess, label in zip(Yguess, labels))
+        total += len(labels)
+
+    if not total:
+        raise ValueError('No reviews of {0} are held out, use a larger corpus or test_fraction.'.format(corpus_file))
+
+    return correct / total, total